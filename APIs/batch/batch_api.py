@@ -0,0 +1,121 @@
+import asyncio
+import os
+from typing import Any, Literal, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, ValidationError
+from APIs.number_game.ng_api import _exit_game, _number_game_step, _start_game
+from APIs.session.session_api import (
+    SessionRequest,
+    start_session_game,
+    resume_session_game,
+    exit_session_game
+)
+from APIs.word_game.wg_api import _word_game_step
+from langgraph_core.game_states.compact import wire_state
+from langgraph_core.game_states.game_state import create_initial_state
+from utils.fast_json import GameRoute
+from utils.gateway import GatewayOverloaded
+
+router = APIRouter(route_class=GameRoute)
+
+# Largest number of items accepted in one /game/batch request
+max_batch_items = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+
+
+class BatchItem(SessionRequest):
+    """
+    One turn of a batch: the body of a /game/start, /game/number, /game/word
+    or /game/exit request, with `step` naming which one.
+    """
+    step: Literal["start", "number", "word", "exit"]
+
+
+class BatchRequest(BaseModel):
+    # Validated one by one in run_batch, so an invalid item only fails itself
+    items: list[Any] = Field(max_length=max_batch_items)
+
+
+async def run_item(item: BatchItem) -> dict:
+    """
+    Run one item the way its endpoint would.
+    """
+    if item.session_id:
+        if item.step == "start":
+            return await start_session_game(item.session_id, item.user_input, item.turn_id)
+        if item.step == "exit":
+            return await exit_session_game(item.session_id, item.turn_id)
+        return await resume_session_game(item.session_id, item.user_input, item.turn_id)
+
+    state = item.state or create_initial_state()
+    if item.step == "start":
+        return wire_state(_start_game(state, item.user_input))
+    if item.step == "number":
+        return wire_state(_number_game_step(state, item.user_input))
+    if item.step == "word":
+        return wire_state(await _word_game_step(state, item.user_input))
+    return wire_state(_exit_game(state, item.user_input))
+
+
+async def run_item_result(item: BatchItem) -> dict:
+    """
+    The item's response, or the error its endpoint would have answered with.
+    """
+    try:
+        return {"status": 200, "response": await run_item(item)}
+    except HTTPException as e:
+        return {"status": e.status_code, "detail": e.detail}
+    except GatewayOverloaded as e:
+        return {"status": 429, "detail": str(e), "retry_after": e.retry_after}
+    except Exception as e:
+        print(f"Error in batch item: {str(e)}")
+        return {"status": 500, "detail": "Internal error"}
+
+
+async def run_batch(raw_items: list) -> list[dict]:
+    """
+    Run the items of a batch and return their results in order.
+
+    Stateless start, number and exit steps make no model calls and run
+    inline, one after the other. Stateless word steps run concurrently, and
+    so do sessions: the items of one session run in the order they were sent,
+    in one task per session, since a session's turn may reach the model
+    whatever its step says. Model calls share the process-wide model gateway
+    like any other request.
+    """
+    results = [None] * len(raw_items)
+    items: list[Optional[BatchItem]] = [None] * len(raw_items)
+    chains: dict[tuple[str, Any], list[int]] = {}
+
+    for i, raw_item in enumerate(raw_items):
+        try:
+            item = items[i] = BatchItem.model_validate(raw_item)
+        except ValidationError as e:
+            results[i] = {"status": 422, "detail": e.errors(include_url=False, include_context=False)}
+            continue
+
+        if item.session_id:
+            chains.setdefault(("session", item.session_id), []).append(i)
+        elif item.step == "word":
+            # Stateless items carry their own state and never depend on each other
+            chains[("state", i)] = [i]
+        else:
+            results[i] = await run_item_result(item)
+
+    async def run_chain(indexes: list[int]):
+        for i in indexes:
+            results[i] = await run_item_result(items[i])
+
+    await asyncio.gather(*(run_chain(indexes) for indexes in chains.values()))
+    return results
+
+
+@router.post("/game/batch")
+async def batch_step(request: BatchRequest):
+    """
+    Advance many games in one request. Each item is run like a request to its
+    step's endpoint and gets a result with the HTTP `status` it would have had,
+    and either the `response` or the error `detail` (plus `retry_after` for a
+    429). An invalid or failed item does not stop the others.
+    """
+    return {"results": await run_batch(request.items)}
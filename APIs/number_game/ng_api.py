@@ -1,22 +1,29 @@
 from fastapi import APIRouter
-from pydantic import BaseModel
-from langgraph_core.graph.graph import app as langgraph_app
-from langgraph_core.game_states.game_state import GameState, create_initial_state
+from APIs.session.session_api import (
+    SessionRequest,
+    start_session_game,
+    resume_session_game,
+    exit_session_game
+)
+from langgraph_core.game_states.compact import wire_state
+from langgraph_core.game_states.game_state import GameState, create_initial_state, current_phase
+from langgraph_core.nodes.selector import game_selector
 from langgraph_core.nodes.number_game import guess_number
 from langgraph_core.nodes.exit import exit_game
+from utils.fast_json import GameRoute
 
-router = APIRouter()
+router = APIRouter(route_class=GameRoute)
 
 
-class GameRequest(BaseModel):
-    state: GameState
-    user_input: str = ""
+@router.post("/game/start")
+async def start_game(request: SessionRequest):
+    if request.session_id:
+        return await start_session_game(request.session_id, request.user_input, request.turn_id)
+    return wire_state(_start_game(request.state or create_initial_state(), request.user_input))
 
 
-@router.post("/game/start")
-def start_game(request: GameRequest):
-    state = request.state
-    user_input = request.user_input.strip()
+def _start_game(state: GameState, user_input: str) -> GameState:
+    user_input = user_input.strip()
 
     # Preserve game counts when starting a new game
     number_game_count = state.get("number_game_count", 0)
@@ -31,6 +38,7 @@ def start_game(request: GameRequest):
             "next_step": "guessing"
         }
         state["__messages__"] = ["Think of a number between 1 and 50. Is your number greater than 25? (y/n)"]
+        state["phase"] = "number_answer"
 
         # Preserve game counts
         state["number_game_count"] = number_game_count
@@ -53,6 +61,7 @@ def start_game(request: GameRequest):
             "Think of a word from this list:",
             "apple, kiwi, desk, chair, car, pen"
         ]
+        state["phase"] = "word_ready"
 
         # Preserve game counts
         state["number_game_count"] = number_game_count
@@ -62,7 +71,7 @@ def start_game(request: GameRequest):
     else:
         try:
             state["__user_input__"] = user_input
-            result = langgraph_app.invoke(state)
+            result = game_selector(state)
 
             # Preserve game counts in the returned state
             if "number_game_count" not in result and number_game_count > 0:
@@ -73,6 +82,7 @@ def start_game(request: GameRequest):
             return result
         except Exception as e:
             state["game_choice"] = None
+            state["phase"] = "select_game"
             state["__messages__"] = ["Please select a valid game option."]
 
             # Preserve game counts
@@ -83,27 +93,36 @@ def start_game(request: GameRequest):
 
 
 @router.post("/game/number")
-def number_game_step(request: GameRequest):
-    state = request.state
-    user_input = request.user_input.strip().lower()
+async def number_game_step(request: SessionRequest):
+    if request.session_id:
+        return await resume_session_game(request.session_id, request.user_input, request.turn_id)
+    return wire_state(_number_game_step(request.state or create_initial_state(), request.user_input))
 
-    all_messages = state.get("__messages__", [])
-    is_play_again_question = any("play again" in msg.lower() for msg in all_messages) or any(
-        "play another game" in msg.lower() for msg in all_messages)
 
-    if is_play_again_question:
-        state["game_choice"] = "retry"
-        state["__user_input__"] = user_input
-        return langgraph_app.invoke(state)
+def _play_again(state: GameState) -> GameState:
+    state["game_choice"] = "retry"
+    return game_selector(state)
 
-    try:
-        state["__user_input__"] = user_input
-        if state.get("game_choice") != "number_game":
-            state["game_choice"] = "number_game"
 
-        updated_state = guess_number(state)
+def _guess_number(state: GameState) -> GameState:
+    if state.get("game_choice") != "number_game":
+        state["game_choice"] = "number_game"
+    return guess_number(state)
+
 
-        return updated_state
+# The step for the answer the game is waiting for; any other phase is an answer to the number question
+NUMBER_GAME_STEPS = {
+    "play_again": _play_again,
+}
+
+
+def _number_game_step(state: GameState, user_input: str) -> GameState:
+    user_input = user_input.strip().lower()
+    step = NUMBER_GAME_STEPS.get(current_phase(state), _guess_number)
+
+    try:
+        state["__user_input__"] = user_input
+        return step(state)
 
     except Exception as e:
         print(f"Error in number_game_step: {str(e)}")
@@ -114,10 +133,15 @@ def number_game_step(request: GameRequest):
         ]
         return state
 
+
 @router.post("/game/exit")
-def exit_game_endpoint(request: GameRequest):
-    state = request.state
+async def exit_game_endpoint(request: SessionRequest):
+    if request.session_id:
+        return await exit_session_game(request.session_id, request.turn_id)
+    return wire_state(_exit_game(request.state or create_initial_state(), request.user_input))
+
 
+def _exit_game(state: GameState, user_input: str) -> GameState:
     result = exit_game(state)
     result["number_game_count"] = 0
     result["word_game_count"] = 0
@@ -0,0 +1,277 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from langgraph.types import Command
+from pydantic import BaseModel, field_validator
+from langgraph_core.game_states.compact import full_state
+from langgraph_core.game_states.game_state import GameState, create_initial_state
+from langgraph_core.graph.checkpointer import aprune_thread, keep_checkpoint_history
+from langgraph_core.graph.graph import app as langgraph_app
+from langgraph_core.nodes.exit import exit_game
+from langgraph_core.nodes.word_game import cancel_question_prefetch, question_preview
+from utils.fast_json import GameRoute, dumps
+from utils.gateway import GatewayOverloaded
+from utils.session_store import session_store
+from utils.tracing import span
+
+router = APIRouter(route_class=GameRoute)
+
+_background_tasks = set()
+
+# One lock per session with a turn running or waiting, and how many turns hold or wait for it
+_turn_locks: dict[str, asyncio.Lock] = {}
+_turn_counts: dict[str, int] = {}
+
+# Nodes whose model output is streamed to the client, and how their partial text is rendered
+STREAMED_NODES = {
+    "ask_questions": question_preview,
+    "guess_word": str.strip,
+}
+
+
+def release_session(session_id: str):
+    cancel_question_prefetch(session_id)
+
+    # Evictions happen inside request handlers, so the checkpoint delete runs in the background
+    task = asyncio.get_running_loop().create_task(langgraph_app.checkpointer.adelete_thread(session_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+# Sessions evicted from the store also drop their graph checkpoints and pending prefetches
+session_store.on_evict = release_session
+
+
+class SessionRequest(BaseModel):
+    """
+    Request body shared by the game endpoints.
+
+    Clients either send the full `state` on every turn, or a `session_id`
+    obtained from /game/session and let the server keep the state.
+    A word game state may be sent in its compact form, as the API returns it.
+    In session mode a `turn_id` makes a turn safe to retry: a turn with the
+    same id as the session's last one is answered with its result instead of
+    being played again.
+    """
+    state: Optional[GameState] = None
+    session_id: Optional[str] = None
+    user_input: str = ""
+    turn_id: Optional[str] = None
+
+    @field_validator("state", mode="before")
+    @classmethod
+    def unpack_state(cls, state):
+        return full_state(state)
+
+
+def session_response(session_id: str, state: GameState) -> dict:
+    """
+    Build the compact response returned in session mode.
+    """
+    return {
+        "session_id": session_id,
+        "game_choice": state.get("game_choice"),
+        "number_game_count": state.get("number_game_count", 0),
+        "word_game_count": state.get("word_game_count", 0),
+        "phase": state.get("phase"),
+        "__messages__": state.get("__messages__", []),
+    }
+
+
+def thread_config(session_id: str) -> dict:
+    return {"configurable": {"thread_id": session_id}}
+
+
+@asynccontextmanager
+async def session_turn(session_id: str):
+    """
+    Run one turn of a session at a time. Every session entry point holds this
+    while it reads and advances the session, so a retry, a second tab or a
+    WebSocket next to HTTP cannot run two turns on the same graph thread at
+    once; the later turn waits and then sees the earlier one's result.
+    The lock is per process, like the in-memory checkpointer. After a turn
+    the thread's older checkpoints are pruned unless CHECKPOINT_KEEP_HISTORY
+    is set.
+    """
+    lock = _turn_locks.setdefault(session_id, asyncio.Lock())
+    _turn_counts[session_id] = _turn_counts.get(session_id, 0) + 1
+    try:
+        async with lock:
+            yield
+            if not keep_checkpoint_history:
+                await aprune_thread(langgraph_app.checkpointer, session_id)
+    finally:
+        _turn_counts[session_id] -= 1
+        if not _turn_counts[session_id]:
+            del _turn_counts[session_id]
+            del _turn_locks[session_id]
+
+
+def get_session_state(session_id: str) -> GameState:
+    state = session_store.get(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return state
+
+
+def played_turn(state: GameState, turn_id: Optional[str]) -> bool:
+    """
+    Whether the session's last turn was the one with this id, i.e. the request is a retry.
+    """
+    return turn_id is not None and state.get("__turn_id__") == turn_id
+
+
+def save_session_state(session_id: str, result: dict, turn_id: Optional[str] = None) -> dict:
+    state = {key: value for key, value in result.items() if key != "__interrupt__"}
+    if turn_id is not None:
+        state["__turn_id__"] = turn_id
+    session_store.set(session_id, state)
+    return session_response(session_id, state)
+
+
+async def start_session_game(session_id: str, user_input: str, turn_id: Optional[str] = None) -> dict:
+    """
+    Start a new graph run on the session thread from the game selector.
+    Game counts carry over from the thread's previous runs.
+    """
+    async with session_turn(session_id):
+        state = get_session_state(session_id)
+        if played_turn(state, turn_id):
+            return session_response(session_id, state)
+        cancel_question_prefetch(session_id)
+
+        with span("graph start", attributes={"session.id": session_id}):
+            result = await langgraph_app.ainvoke(
+                {
+                    "game_choice": None,
+                    "number_game_state": None,
+                    "word_game_state": None,
+                    "phase": "select_game",
+                    "__messages__": [],
+                    "__user_input__": user_input.strip()
+                },
+                thread_config(session_id)
+            )
+        return save_session_state(session_id, result, turn_id)
+
+
+async def resume_session_game(session_id: str, user_input: str, turn_id: Optional[str] = None) -> dict:
+    """
+    Resume the session thread at the node waiting for the player's input.
+    """
+    async with session_turn(session_id):
+        state = get_session_state(session_id)
+        config = thread_config(session_id)
+
+        # Nothing is waiting for input (e.g. the game already ended), or this turn was already played
+        if played_turn(state, turn_id) or not (await langgraph_app.aget_state(config)).next:
+            return session_response(session_id, state)
+
+        with span("graph resume", attributes={"session.id": session_id}):
+            result = await langgraph_app.ainvoke(Command(resume=user_input), config)
+        return save_session_state(session_id, result, turn_id)
+
+
+async def stream_session_game(session_id: str, user_input: str, turn_id: Optional[str] = None):
+    """
+    Resume the session thread like resume_session_game, yielding ("token", ...)
+    events with the partial question or guess while the model generates it,
+    then a final ("state", ...) event with the compact response, or an
+    ("error", ...) event if the model gateway turned the turn away.
+    """
+    async with session_turn(session_id):
+        state = get_session_state(session_id)
+        config = thread_config(session_id)
+
+        if played_turn(state, turn_id) or not (await langgraph_app.aget_state(config)).next:
+            yield "state", session_response(session_id, state)
+            return
+
+        generated = {}
+        result = None
+        try:
+            with span("graph stream", attributes={"session.id": session_id}) as current:
+                async for mode, chunk in langgraph_app.astream(
+                        Command(resume=user_input), config, stream_mode=["messages", "values"]):
+                    if mode == "values":
+                        # The run ends with an {"__interrupt__": ...} chunk when it pauses for input
+                        if "__interrupt__" not in chunk:
+                            result = chunk
+                        continue
+
+                    # Structured-output and tool-call chunks carry no text content
+                    message, metadata = chunk
+                    node = metadata.get("langgraph_node")
+                    if node not in STREAMED_NODES or not isinstance(message.content, str) or not message.content:
+                        continue
+
+                    previous = STREAMED_NODES[node](generated.get(node, ""))
+                    generated[node] = generated.get(node, "") + message.content
+                    text = STREAMED_NODES[node](generated[node])
+                    if text and text != previous:
+                        if current is not None and "stream.first_token_ms" not in current.attributes:
+                            current.set_attribute(
+                                "stream.first_token_ms", (time.time_ns() - current.start_time_unix_nano) / 1e6
+                            )
+                        yield "token", {"node": node, "text": text}
+
+        except GatewayOverloaded as e:
+            # The response has already started, so the 429 is sent as an event instead.
+            # The thread stays at the failed node and the same input can be sent again.
+            yield "error", {"status": 429, "detail": str(e), "retry_after": e.retry_after}
+            return
+
+        yield "state", save_session_state(session_id, result, turn_id)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+async def exit_session_game(session_id: str, turn_id: Optional[str] = None) -> dict:
+    """
+    Report the session statistics and reset the game counts.
+    """
+    async with session_turn(session_id):
+        state = get_session_state(session_id)
+        if played_turn(state, turn_id):
+            return session_response(session_id, state)
+        state = exit_game(state)
+        cancel_question_prefetch(session_id)
+
+        state["game_choice"] = None
+        state["number_game_count"] = 0
+        state["word_game_count"] = 0
+
+        # Finish any paused run and reset the counts on the thread as well
+        config = thread_config(session_id)
+        if (await langgraph_app.aget_state(config)).values:
+            await langgraph_app.aupdate_state(config, {
+                "game_choice": None,
+                "number_game_count": 0,
+                "word_game_count": 0,
+                "__messages__": state["__messages__"]
+            }, as_node="game_selector")
+        return save_session_state(session_id, state, turn_id)
+
+
+def new_session() -> dict:
+    session_id = uuid.uuid4().hex
+    state = create_initial_state()
+    session_store.set(session_id, state)
+    return session_response(session_id, state)
+
+
+@router.post("/game/session")
+async def create_session():
+    return new_session()
+
+
+@router.delete("/game/session/{session_id}")
+async def delete_session(session_id: str):
+    session_store.delete(session_id)
+    return {"session_id": session_id}
@@ -0,0 +1,128 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from APIs.session.session_api import (
+    session_response,
+    new_session,
+    start_session_game,
+    stream_session_game,
+    exit_session_game
+)
+from utils.fast_json import dumps, loads
+from utils.gateway import GatewayOverloaded
+from utils.session_store import session_store
+
+router = APIRouter()
+
+# Send a ping after this many idle seconds, and close after two unanswered ones
+heartbeat_seconds = float(os.getenv("WS_HEARTBEAT_SECONDS", "30"))
+
+
+class GameChannel:
+    """
+    One WebSocket connection bound to one game session.
+
+    Sends are best effort: if the client goes away mid-turn the turn still runs
+    to completion, so the session is consistent when the client resumes.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.connected = True
+
+    async def send(self, frame: dict):
+        if not self.connected:
+            return
+        try:
+            await self.websocket.send_text(dumps(frame).decode())
+        except (WebSocketDisconnect, RuntimeError):
+            self.connected = False
+
+    async def send_state(self, response: dict):
+        await self.send({"type": "state", **response})
+
+    async def handle(self, frame: dict):
+        frame_type = frame.get("type")
+        user_input = str(frame.get("input", ""))
+        turn_id = str(frame["turn_id"]) if frame.get("turn_id") is not None else None
+
+        if frame_type == "ping":
+            await self.send({"type": "pong"})
+        elif frame_type == "pong":
+            pass
+        elif frame_type == "start":
+            await self.send_state(await start_session_game(self.session_id, user_input, turn_id))
+        elif frame_type == "input":
+            async for event, data in stream_session_game(self.session_id, user_input, turn_id):
+                if event == "token":
+                    await self.send({"type": "token", **data})
+                elif event == "error":
+                    await self.send({"type": "error", **data})
+                else:
+                    await self.send_state(data)
+        elif frame_type == "exit":
+            await self.send_state(await exit_session_game(self.session_id, turn_id))
+        else:
+            await self.send({"type": "error", "detail": f"Unknown frame type: {frame_type}"})
+
+
+def open_session(session_id: str) -> dict:
+    """
+    Resume the given session, or create a new one if it is missing or expired.
+    """
+    state = session_store.get(session_id) if session_id else None
+    if state is None:
+        return new_session()
+    return session_response(session_id, state)
+
+
+@router.websocket("/ws/game")
+async def game_channel(websocket: WebSocket, session_id: str = ""):
+    """
+    Persistent game channel.
+
+    Connect with `?session_id=...` to resume a session (a new one is created
+    otherwise); the first frame is the session's current state. Client frames:
+    {"type": "start" | "input", "input": "..."}, {"type": "exit"} and
+    {"type": "ping"}. Server frames: "state" (the /game/* session response),
+    "token" (streamed question or guess text), "pong", "ping" and "error".
+    """
+    await websocket.accept()
+    response = open_session(session_id)
+    channel = GameChannel(websocket, response["session_id"])
+    await channel.send_state(response)
+
+    missed_heartbeats = 0
+    while channel.connected:
+        try:
+            frame = loads(await asyncio.wait_for(websocket.receive_text(), timeout=heartbeat_seconds))
+        except asyncio.TimeoutError:
+            missed_heartbeats += 1
+            if missed_heartbeats > 2:
+                await websocket.close(code=1001)
+                return
+            await channel.send({"type": "ping"})
+            continue
+        except (WebSocketDisconnect, RuntimeError):
+            return
+        except ValueError:
+            await channel.send({"type": "error", "detail": "Frames must be JSON objects"})
+            continue
+
+        missed_heartbeats = 0
+        if not isinstance(frame, dict):
+            await channel.send({"type": "error", "detail": "Frames must be JSON objects"})
+            continue
+
+        try:
+            await channel.handle(frame)
+        except HTTPException as e:
+            await channel.send({"type": "error", "detail": e.detail})
+        except GatewayOverloaded as e:
+            await channel.send({"type": "error", "status": 429, "detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            # Keep the channel open: the client can retry the turn or start over
+            print(f"Error in game channel: {str(e)}")
+            await channel.send({"type": "error", "status": 500, "detail": "Internal error"})
@@ -1,80 +1,103 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from langgraph_core.graph.graph import app as langgraph_app
-from langgraph_core.game_states.game_state import GameState, create_initial_state
-from langgraph_core.nodes.word_game import ask_questions, guess_word
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from APIs.session.session_api import (
+    SessionRequest,
+    resume_session_game,
+    exit_session_game,
+    get_session_state,
+    stream_session_game,
+    sse_event
+)
+from langgraph_core.game_states.compact import wire_state
+from langgraph_core.game_states.game_state import GameState, create_initial_state, current_phase
+from langgraph_core.nodes.selector import game_selector
+from langgraph_core.nodes.word_game import (
+    aask_questions,
+    aguess_word,
+    check_guess,
+    arecord_word_answer,
+    ready_to_guess
+)
 from langgraph_core.nodes.exit import exit_game
+from utils.fast_json import GameRoute
+from utils.gateway import GatewayOverloaded
 
-router = APIRouter()
-
-class WordGameRequest(BaseModel):
-    state: GameState
-    user_input: str = ""
+router = APIRouter(route_class=GameRoute)
 
 @router.post("/game/word")
-def word_game_step(request: WordGameRequest):
-    state = request.state
-    user_input = request.user_input.strip().lower()
+async def word_game_step(request: SessionRequest):
+    if request.session_id:
+        return await resume_session_game(request.session_id, request.user_input, request.turn_id)
+    return wire_state(await _word_game_step(request.state or create_initial_state(), request.user_input))
 
-    all_messages = state.get("__messages__", [])
-    is_play_again_question = any("play again" in msg.lower() for msg in all_messages) or any(
-        "play another game" in msg.lower() for msg in all_messages)
 
-    if is_play_again_question:
-        state["game_choice"] = "retry"
-        state["__user_input__"] = user_input
-        return langgraph_app.invoke(state)
+@router.post("/game/word/stream")
+async def word_game_stream(request: SessionRequest):
+    """
+    Session-mode /game/word that streams the question or guess as server-sent
+    events while it is generated: `token` events carry the text so far and a
+    final `state` event carries the same response as /game/word. When the
+    model is overloaded the stream ends with an `error` event instead, with
+    the `retry_after` seconds a 429 would have sent.
+    """
+    if not request.session_id:
+        raise HTTPException(status_code=400, detail="Streaming requires a session_id")
+
+    # Fail with a 404 before the stream starts
+    get_session_state(request.session_id)
+    events = stream_session_game(request.session_id, request.user_input, request.turn_id)
+    return StreamingResponse(
+        (sse_event(event, data) async for event, data in events),
+        media_type="text/event-stream"
+    )
+
+
+async def _play_again(state: GameState) -> GameState:
+    state["game_choice"] = "retry"
+    return game_selector(state)
+
+
+async def _check_guess(state: GameState) -> GameState:
+    return check_guess(state)
+
+
+async def _answer_question(state: GameState) -> GameState:
+    wg = state.get("word_game_state", {})
+    if not wg.get("questions", []):
+        return await aask_questions(state)
+
+    await arecord_word_answer(state)
+    if ready_to_guess(wg):
+        return await aguess_word(state)
+    return await aask_questions(state)
+
+
+# The step for the answer the game is waiting for; any other phase is an answer to a question
+WORD_GAME_STEPS = {
+    "play_again": _play_again,
+    "word_ready": aask_questions,
+    "guess_feedback": _check_guess,
+}
+
+
+async def _word_game_step(state: GameState, user_input: str) -> GameState:
+    user_input = user_input.strip().lower()
+    phase = current_phase(state)
 
     try:
         state["__user_input__"] = user_input
-        if state.get("game_choice") != "word_game":
+        if phase != "play_again" and state.get("game_choice") != "word_game":
             state["game_choice"] = "word_game"
 
-        wg = state.get("word_game_state", {})
-
-        if wg.get("current_question_index", 0) == 0 and not wg.get("questions", []):
-            return ask_questions(state)
-
-        is_responding_to_guess = any("My guess is" in msg for msg in all_messages) and any(
-            "Was I correct?" in msg for msg in all_messages)
-        if is_responding_to_guess:
-            if user_input.lower() in ["yes", "y"]:
-                state["__messages__"] = [
-                    "Yay! I guessed right!",
-                    "Would you like to play again?"
-                ]
-            else:
-                state["__messages__"] = [
-                    "I'm sorry I couldn't guess your word.",
-                    "Would you like to play again?"
-                ]
-            return state
-
-        current_q = wg.get("current_question_index", 1)
-        max_q = wg.get("max_number_of_questions", 5)
-        if current_q >= max_q:
-            return guess_word(state)
-
-        return ask_questions(state)
+        return await WORD_GAME_STEPS.get(phase, _answer_question)(state)
 
+    except GatewayOverloaded:
+        raise
     except Exception as e:
         print(f"Error in word_game_step: {str(e)}")
 
-        is_responding_to_guess = any("My guess is" in msg for msg in all_messages) and any(
-            "Was I correct?" in msg for msg in all_messages)
-
-        if is_responding_to_guess:
-            if user_input.lower() in ["yes", "y"]:
-                state["__messages__"] = [
-                    "Yay! I guessed right!",
-                    "Would you like to play again?"
-                ]
-            else:
-                state["__messages__"] = [
-                    "I'm sorry I couldn't guess your word.",
-                    "Would you like to play again?"
-                ]
-            return state
+        if phase == "guess_feedback":
+            return check_guess(state)
 
         state["__messages__"] = [
             "I'm having trouble with the word game at the moment.",
@@ -84,9 +107,13 @@ def word_game_step(request: WordGameRequest):
 
 
 @router.post("/game/exit")
-def exit_game_endpoint(request: WordGameRequest):
-    state = request.state
+async def exit_game_endpoint(request: SessionRequest):
+    if request.session_id:
+        return await exit_session_game(request.session_id, request.turn_id)
+    return wire_state(_exit_game(request.state or create_initial_state(), request.user_input))
+
 
+def _exit_game(state: GameState, user_input: str) -> GameState:
     result = exit_game(state)
     result["number_game_count"] = 0
     result["word_game_count"] = 0
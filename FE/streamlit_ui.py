@@ -2,14 +2,17 @@ import streamlit as st
 import requests
 import json
 import time
+import uuid
 from dotenv import load_dotenv
+from websockets.exceptions import WebSocketException
+from websockets.sync.client import connect
 
 load_dotenv()
 
 import sys, os
 
 sys.path.append(os.getenv("PYTHONPATH", "."))
-from langgraph_core.game_states.game_state import GameState, create_initial_state
+from langgraph_core.game_states.game_state import GameState, create_initial_state, current_phase
 
 # Set page configuration with a dark theme
 st.set_page_config(
@@ -22,6 +25,27 @@ st.set_page_config(
 # API URL - change this if your FastAPI is running on a different port/host
 API_URL = "http://localhost:8000"
 
+# Session mode keeps the game state on the server; only the session id and input are sent per turn
+USE_SESSIONS = os.getenv("GAME_API_SESSIONS", "true").lower() == "true"
+
+# Stream word game questions and guesses as they are generated (session mode only)
+USE_STREAMING = os.getenv("GAME_API_STREAMING", "true").lower() == "true"
+
+# Play over one persistent WebSocket per session instead of an HTTP request per turn
+USE_WEBSOCKET = os.getenv("GAME_API_WEBSOCKET", "false").lower() == "true"
+WS_URL = API_URL.replace("http", "ws", 1) + "/ws/game"
+
+# Chat messages kept on screen; older ones are dropped so reruns stay fast in long sessions
+MAX_CHAT_MESSAGES = int(os.getenv("MAX_CHAT_MESSAGES", "100"))
+
+# WebSocket frame sent for each game endpoint
+WS_FRAME_TYPES = {
+    "/game/start": "start",
+    "/game/number": "input",
+    "/game/word": "input",
+    "/game/exit": "exit"
+}
+
 # Custom CSS with improved visibility
 st.markdown("""
 <style>
@@ -142,19 +166,108 @@ if 'retries' not in st.session_state:
     st.session_state.retries = 0
 if 'input_key' not in st.session_state:
     st.session_state.input_key = 0
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = None
+if 'game_socket' not in st.session_state:
+    st.session_state.game_socket = None
+
+
+# Function to get (or lazily create) the server-side session id
+def get_session_id():
+    if not USE_SESSIONS:
+        return None
+
+    if st.session_state.session_id is None:
+        try:
+            response = requests.post(f"{API_URL}/game/session", timeout=10)
+            response.raise_for_status()
+            st.session_state.session_id = response.json()["session_id"]
+        except requests.exceptions.RequestException:
+            # Fall back to sending the full state
+            return None
+
+    return st.session_state.session_id
+
+
+# Function to open (or resume) the game WebSocket, returning it with the session's current state
+def open_game_socket():
+    url = f"{WS_URL}?session_id={st.session_state.session_id or ''}"
+    socket = connect(url, open_timeout=10)
+    current = json.loads(socket.recv(timeout=10))
+    st.session_state.session_id = current["session_id"]
+    st.session_state.game_socket = socket
+    return socket, current
+
+
+# Function to play one turn over the game WebSocket, rendering streamed text as it arrives
+def send_game_frame(endpoint, user_input="", turn_id=None):
+    st.session_state.error = None
+    frame = json.dumps({"type": WS_FRAME_TYPES[endpoint], "input": user_input, "turn_id": turn_id or uuid.uuid4().hex})
+    placeholder = st.empty()
+
+    for attempt in range(2):
+        try:
+            socket = st.session_state.game_socket
+            if socket is None:
+                socket, current = open_game_socket()
+                # The connection dropped after the server had already played this turn
+                if attempt > 0 and current["__messages__"] != st.session_state.state.get("__messages__"):
+                    return current
+
+            socket.send(frame)
+            while True:
+                message = json.loads(socket.recv(timeout=30))
+                if message["type"] == "ping":
+                    socket.send(json.dumps({"type": "pong"}))
+                elif message["type"] == "token":
+                    placeholder.markdown(
+                        f'<div class="message-container system-message">{message["text"]}</div>',
+                        unsafe_allow_html=True
+                    )
+                elif message["type"] == "error":
+                    placeholder.empty()
+                    st.session_state.error = f"API Error: {message['detail']}"
+                    return None
+                elif message["type"] == "state":
+                    placeholder.empty()
+                    return message
+
+        except (OSError, TimeoutError, WebSocketException):
+            # Reconnect with the session id and resume
+            if st.session_state.game_socket is not None:
+                st.session_state.game_socket.close()
+            st.session_state.game_socket = None
+
+    placeholder.empty()
+    st.session_state.error = "API Error: the game connection was lost"
+    return None
 
 
 # Function to make API requests with error handling and retries
-def make_api_request(endpoint, state, user_input="", max_retries=3):
+def make_api_request(endpoint, state, user_input="", max_retries=3, turn_id=None):
+    if USE_WEBSOCKET:
+        return send_game_frame(endpoint, user_input, turn_id)
+
     st.session_state.error = None
     retries = 0
 
+    # Every attempt of a session turn carries the same id, so the server plays it at most once
+    turn_id = turn_id or uuid.uuid4().hex
+
     while retries < max_retries:
+        session_id = get_session_id()
         try:
-            payload = {
-                "state": state,
-                "user_input": user_input
-            }
+            if session_id:
+                payload = {
+                    "session_id": session_id,
+                    "user_input": user_input,
+                    "turn_id": turn_id
+                }
+            else:
+                payload = {
+                    "state": state,
+                    "user_input": user_input
+                }
 
             # Make request
             response = requests.post(f"{API_URL}{endpoint}", json=payload, timeout=10)
@@ -162,13 +275,20 @@ def make_api_request(endpoint, state, user_input="", max_retries=3):
             return response.json()
 
         except requests.exceptions.RequestException as e:
+            # The session expired on the server, start a new one on the next attempt
+            if e.response is not None and e.response.status_code == 404:
+                st.session_state.session_id = None
+
             # Retry with backoff
             retries += 1
             st.session_state.retries = retries
 
             if retries < max_retries:
-                # Wait with exponential backoff
-                time.sleep(0.5 * (2 ** retries))
+                # Wait as long as an overloaded server asks, otherwise back off exponentially
+                if e.response is not None and e.response.status_code == 429:
+                    time.sleep(min(float(e.response.headers.get("Retry-After", 1)), 10))
+                else:
+                    time.sleep(0.5 * (2 ** retries))
             else:
                 # Max retries reached
                 error_msg = f"API Error after {max_retries} attempts: {str(e)}"
@@ -176,6 +296,51 @@ def make_api_request(endpoint, state, user_input="", max_retries=3):
                 return None
 
 
+# Function to stream a session turn over server-sent events, rendering the text as it arrives
+def stream_api_request(endpoint, user_input=""):
+    st.session_state.error = None
+    session_id = get_session_id()
+    placeholder = st.empty()
+    turn_id = uuid.uuid4().hex
+
+    try:
+        payload = {
+            "session_id": session_id,
+            "user_input": user_input,
+            "turn_id": turn_id
+        }
+        with requests.post(f"{API_URL}{endpoint}", json=payload, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event == "token":
+                        placeholder.markdown(
+                            f'<div class="message-container system-message">{data["text"]}</div>',
+                            unsafe_allow_html=True
+                        )
+                    elif event == "state":
+                        placeholder.empty()
+                        return data
+                    elif event == "error":
+                        placeholder.empty()
+                        st.session_state.error = f"API Error: {data['detail']}"
+                        return None
+
+    except requests.exceptions.RequestException as e:
+        if e.response is not None and e.response.status_code == 404:
+            st.session_state.session_id = None
+
+    placeholder.empty()
+    # Send the turn again without streaming. With the same turn id the server
+    # answers with the turn's result if it already played it, instead of
+    # applying the answer to the next question.
+    return make_api_request(endpoint.removesuffix("/stream"), st.session_state.state, user_input, turn_id=turn_id)
+
+
 # Function to display messages
 def display_messages():
     for msg in st.session_state.messages:
@@ -185,6 +350,11 @@ def display_messages():
             st.markdown(f'<div class="message-container user-message">{msg["content"]}</div>', unsafe_allow_html=True)
 
 
+def add_messages(messages, message_type="system"):
+    st.session_state.messages.extend({"type": message_type, "content": msg} for msg in messages)
+    del st.session_state.messages[:-MAX_CHAT_MESSAGES]
+
+
 # Helper function to navigate between pages
 def navigate_to(page):
     st.session_state.page = page
@@ -193,7 +363,7 @@ def navigate_to(page):
 # Add the submit_response function
 def submit_response(user_response):
     # Add user message to chat
-    st.session_state.messages.append({"type": "user", "content": user_response})
+    add_messages([user_response], "user")
 
     # Determine API endpoint
     endpoint = None
@@ -208,7 +378,10 @@ def submit_response(user_response):
             number_count = st.session_state.state.get('number_game_count', 0)
             word_count = st.session_state.state.get('word_game_count', 0)
 
-            result = make_api_request(endpoint, st.session_state.state, user_response)
+            if endpoint == "/game/word" and USE_STREAMING and not USE_WEBSOCKET and get_session_id():
+                result = stream_api_request("/game/word/stream", user_response)
+            else:
+                result = make_api_request(endpoint, st.session_state.state, user_response)
             if result:
                 # Update state with API response
                 st.session_state.state = result
@@ -224,20 +397,10 @@ def submit_response(user_response):
                     st.session_state.state['word_game_count'] = word_count
 
                 # Add system messages
-                for msg in result.get("__messages__", []):
-                    st.session_state.messages.append({"type": "system", "content": msg})
+                add_messages(result.get("__messages__", []))
 
-                # Check for specific game state transitions
-                if result.get("game_choice") is None:
-                    # Game is over, return to home
-                    navigate_to('home')
-                elif "Would you like to play another game?" in " ".join(
-                        result.get("__messages__", [])) or "Would you like to play again?" in " ".join(
-                    result.get("__messages__", [])):
-                    # Stay in the current screen to get the yes/no response
-                    pass
-                elif "Returning to game selection" in " ".join(result.get("__messages__", [])):
-                    # Explicitly return to home screen
+                # Game over or back at game selection: return to home
+                if result.get("game_choice") is None or current_phase(result) == "select_game":
                     navigate_to('home')
             else:
                 # Keep gameplay page open even if there's an error
@@ -297,8 +460,7 @@ if st.session_state.page == 'home':
                     if 'word_game_count' not in result or result.get('word_game_count', 0) == 0:
                         st.session_state.state['word_game_count'] = word_count
 
-                    for msg in result.get("__messages__", []):
-                        st.session_state.messages.append({"type": "system", "content": msg})
+                    add_messages(result.get("__messages__", []))
                     navigate_to('gameplay')
                     st.rerun()
                 else:
@@ -336,8 +498,7 @@ if st.session_state.page == 'home':
                     if 'word_game_count' not in result or result.get('word_game_count', 0) == 0:
                         st.session_state.state['word_game_count'] = word_count
 
-                    for msg in result.get("__messages__", []):
-                        st.session_state.messages.append({"type": "system", "content": msg})
+                    add_messages(result.get("__messages__", []))
                     navigate_to('gameplay')
                     st.rerun()
                 else:
@@ -356,8 +517,7 @@ if st.session_state.page == 'home':
                 if result:
                     st.session_state.state = result
                     st.session_state.messages = []
-                    for msg in result.get("__messages__", []):
-                        st.session_state.messages.append({"type": "system", "content": msg})
+                    add_messages(result.get("__messages__", []))
                     navigate_to('exit')
                 else:
                     # Create default stats message if API fails
@@ -383,16 +543,11 @@ elif st.session_state.page == 'gameplay':
     # Display chat history
     display_messages()
 
-    # Get all message contents for easier analysis
-    all_message_content = " ".join([m.get('content', '') for m in st.session_state.messages])
-    last_message = st.session_state.messages[-1]['content'] if st.session_state.messages else ""
-
-    # Check if we're at the "play again" prompt or if the number was just guessed
-    is_play_again = ("Would you like to play again?" in all_message_content or
-                     "Would you like to play another game?" in all_message_content)
-    is_number_guessed = "Your number is" in last_message and st.session_state.game_type == "number_game"
+    # What the game is waiting for decides the input shown
+    phase = current_phase(st.session_state.state)
+    is_play_again = phase == "play_again"
 
-    if is_play_again or is_number_guessed:
+    if is_play_again:
         st.markdown("<br>", unsafe_allow_html=True)
         col1, col2 = st.columns(2)
         with col1:
@@ -416,20 +571,14 @@ elif st.session_state.page == 'gameplay':
                 navigate_to('home')
                 st.rerun()
     # Special case for word selection phase
-    elif ("Think of a word from this list" in all_message_content and
-          "Question" not in all_message_content):
+    elif phase == "word_ready":
         # Word selection phase - only show the button
         st.markdown("<br>", unsafe_allow_html=True)
         if st.button("I've Selected a Word", key="ready_button"):
             submit_response("")  # Empty response to start the game
     else:
         # Check if this is the number game and requires yes/no response
-        if st.session_state.game_type == "number_game" and any(phrase in last_message for phrase in
-                                                               ["Is your number greater than",
-                                                                "Is your number higher than",
-                                                                "Is your number less than",
-                                                                "Is your number lower than",
-                                                                "Is your number equal to"]) and "(y/n)" in last_message:
+        if st.session_state.game_type == "number_game" and phase == "number_answer":
             # Use a dropdown for yes/no in the number game
             yes_no_options = ["Select response", "y", "n"]
             user_selection = st.selectbox("Select your response:",
@@ -443,8 +592,7 @@ elif st.session_state.page == 'gameplay':
             elif submit and user_selection == "Select response":
                 st.warning("Please select an option before submitting.")
         # Check if this is the word game and requires yes/no/maybe response
-        elif st.session_state.game_type == "word_game" and ("Your answer? (yes/no/maybe)" in last_message or
-                                                            "(yes/no/maybe)" in last_message):
+        elif st.session_state.game_type == "word_game" and phase == "word_answer":
             # Use a dropdown for yes/no/maybe in the word game
             options = ["Select response", "yes", "no", "maybe"]
             user_selection = st.selectbox("Select your response:",
@@ -465,7 +613,7 @@ elif st.session_state.page == 'gameplay':
                 submit_response(user_input.strip())
 
     # Add "Back to Home" button (only show if not already on the play again screen)
-    if not is_play_again and not is_number_guessed:
+    if not is_play_again:
         st.markdown("<br>", unsafe_allow_html=True)
         if st.button("Exit Game", key="exit_game_button"):
             navigate_to('home')
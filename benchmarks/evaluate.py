@@ -0,0 +1,304 @@
+"""
+Offline game-quality and efficiency evaluator.
+
+Plays both games end to end through the LangGraph `app` with oracle players
+(a player who picks a number or word and answers truthfully), spread over a
+process pool, and reports accuracy, turns, LLM calls and tokens per game and
+wall time. Uses the fake chat model unless LLM_PROVIDER is set, so evaluating
+a prompt change against the real model means running with LLM_PROVIDER=openai:
+
+    PYTHONPATH=. python -m benchmarks.evaluate --games 200 --workers 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from statistics import mean, median
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.prompts import PromptTemplate
+
+# Games the oracle never finishes are cut off after this many answers
+MAX_TURNS = 30
+
+ATTRIBUTES_PATH = os.path.join(os.path.dirname(__file__), "..", "langgraph_core", "data", "word_attributes.json")
+
+# Asked for questions the attribute table does not cover
+oracle_prompt = PromptTemplate.from_template(
+    """You are playing a guessing game and your secret word is "{word}".
+Answer the question about your word truthfully with exactly one of: yes, no or maybe.
+Question: {question}
+Answer:"""
+)
+
+# Oracle calls are tagged so they are not counted as game LLM calls
+ORACLE_CALL = {"run_name": "oracle_answer", "tags": ["oracle"]}
+
+
+class UsageCounter(BaseCallbackHandler):
+    """
+    Counts the chat model calls (cache hits never reach the model) and tokens
+    of the game, leaving out the oracle's own calls.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+        self._oracle_runs = set()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        if tags and "oracle" in tags:
+            self._oracle_runs.add(run_id)
+        else:
+            self.calls += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        if run_id in self._oracle_runs:
+            self._oracle_runs.discard(run_id)
+            return
+
+        tokens = sum(
+            generation.message.usage_metadata["total_tokens"]
+            for generations in response.generations for generation in generations
+            if getattr(generation, "message", None) is not None and generation.message.usage_metadata
+        )
+        if not tokens:
+            tokens = ((response.llm_output or {}).get("token_usage") or {}).get("total_tokens", 0)
+        self.tokens += tokens
+
+    def reset(self):
+        self.calls = 0
+        self.tokens = 0
+
+
+class WordOracle:
+    """
+    Answers questions about its secret word from the attribute table, falling
+    back to asking the model for questions the table does not cover.
+    """
+
+    def __init__(self, model, path: str = ATTRIBUTES_PATH):
+        with open(path) as f:
+            data = json.load(f)
+        questions = [attribute["question"] for attribute in data["attributes"]]
+        self.table = {word: dict(zip(questions, values)) for word, values in data["words"].items()}
+        self.model = model
+
+    async def answer(self, word: str, question: str) -> str:
+        value = self.table.get(word, {}).get(question)
+        if value is not None:
+            return "yes" if value == 1 else "no" if value == 0 else "maybe"
+
+        try:
+            response = await self.model.ainvoke(oracle_prompt.format(word=word, question=question), ORACLE_CALL)
+            match = re.search(r"\b(yes|no|maybe)\b", response.content.lower())
+            return match.group(1) if match else "maybe"
+        except Exception as e:
+            print(f"Error in oracle answer: {str(e)}")
+            return "maybe"
+
+
+def new_run_input(game: str) -> dict:
+    return {
+        "game_choice": None,
+        "number_game_state": None,
+        "word_game_state": None,
+        "__messages__": [],
+        "__user_input__": "1" if game == "number" else "2"
+    }
+
+
+async def play_number_game(app, config: dict, secret: int) -> dict:
+    from langgraph.types import Command
+
+    result = await app.ainvoke(new_run_input("number"), config)
+    result = await app.ainvoke(Command(resume=""), config)
+    turns = 0
+    while turns < MAX_TURNS:
+        messages = " ".join(result["__messages__"])
+        match = re.search(r"Is your number greater than (\d+)", messages)
+        if not match:
+            guessed = re.search(r"Your number is (\d+)", messages)
+            return {"turns": turns, "correct": bool(guessed) and int(guessed.group(1)) == secret}
+
+        turns += 1
+        result = await app.ainvoke(Command(resume="y" if secret > int(match.group(1)) else "n"), config)
+    return {"turns": turns, "correct": False}
+
+
+async def play_word_game(app, config: dict, secret: str, oracle: WordOracle) -> dict:
+    from langgraph.types import Command
+
+    result = await app.ainvoke(new_run_input("word"), config)
+    result = await app.ainvoke(Command(resume=""), config)
+    turns = 0
+    while turns < MAX_TURNS:
+        messages = result["__messages__"]
+        guess = re.search(r"My guess is: \*\*(.+?)\*\*", " ".join(messages))
+        if guess:
+            # The model's guess may carry punctuation (e.g. "Kiwi!")
+            correct = re.sub(r"[^a-z ]", "", guess.group(1).lower()).strip() == secret
+            await app.ainvoke(Command(resume="yes" if correct else "no"), config)
+            return {"turns": turns, "correct": correct}
+
+        question = next((message.split(": ", 1)[1] for message in messages if message.startswith("Question ")), None)
+        if question is None:
+            break
+
+        turns += 1
+        result = await app.ainvoke(Command(resume=await oracle.answer(secret, question)), config)
+    return {"turns": turns, "correct": False}
+
+
+async def play_games(specs: list[dict]) -> list[dict]:
+    # Imported in the worker so each process builds its own graph and model
+    from langgraph_core.graph.checkpointer import async_checkpointer
+    from langgraph_core.graph.graph import app
+    from langgraph_core.nodes.word_game import cancel_question_prefetch
+    from utils.model import base_chat_model, model
+
+    async with async_checkpointer() as saver:
+        app.checkpointer = saver
+
+        # Attached to the underlying chat model, so prefetches are counted and cache hits are not
+        counter = UsageCounter()
+        base_chat_model().callbacks = [counter]
+        oracle = WordOracle(model)
+
+        results = []
+        for spec in specs:
+            thread_id = f"eval-{spec['index']}"
+            config = {"configurable": {"thread_id": thread_id}}
+            counter.reset()
+            start = time.perf_counter()
+            try:
+                if spec["game"] == "number":
+                    outcome = await play_number_game(app, config, spec["secret"])
+                else:
+                    outcome = await play_word_game(app, config, spec["secret"], oracle)
+                error = None
+            except Exception as e:
+                outcome = {"turns": 0, "correct": False}
+                error = str(e)
+            cancel_question_prefetch(thread_id)
+            await app.checkpointer.adelete_thread(thread_id)
+
+            results.append({
+                **spec,
+                **outcome,
+                "error": error,
+                "llm_calls": counter.calls,
+                "tokens": counter.tokens,
+                "wall_time_s": time.perf_counter() - start,
+            })
+        return results
+
+
+def play_chunk(specs: list[dict]) -> list[dict]:
+    return asyncio.run(play_games(specs))
+
+
+def game_specs(games: int, word_ratio: float, seed: int) -> list[dict]:
+    from langgraph_core.nodes.word_game import WORD_LIST
+
+    rng = random.Random(seed)
+    specs = []
+    for index in range(games):
+        if rng.random() < word_ratio:
+            specs.append({"index": index, "game": "word", "secret": rng.choice(WORD_LIST)})
+        else:
+            specs.append({"index": index, "game": "number", "secret": rng.randint(1, 50)})
+    return specs
+
+
+def summarize(results: list[dict]) -> dict:
+    summary = {}
+    for game in ["number", "word"]:
+        played = [result for result in results if result["game"] == game]
+        if not played:
+            continue
+        summary[game] = {
+            "games": len(played),
+            "errors": sum(1 for result in played if result["error"]),
+            "accuracy": mean(result["correct"] for result in played),
+            "turns_mean": mean(result["turns"] for result in played),
+            "turns_median": median(result["turns"] for result in played),
+            "turns_max": max(result["turns"] for result in played),
+            "llm_calls_per_game": mean(result["llm_calls"] for result in played),
+            "tokens_per_game": mean(result["tokens"] for result in played),
+            "game_time_mean_s": mean(result["wall_time_s"] for result in played),
+        }
+    return summary
+
+
+def prompt_fingerprint() -> str:
+    """
+    Short hash of the word game prompts, to tell evaluation runs of different prompts apart.
+    """
+    from langgraph_core.prompts import wg_prompts
+
+    templates = [wg_prompts.get_question_prompt.template, wg_prompts.guess_word_prompt.template,
+                 wg_prompts.word_turn_prompt.template]
+    return hashlib.sha256("\x00".join(templates).encode()).hexdigest()[:12]
+
+
+def evaluate(games: int, workers: int, word_ratio: float = 0.5, seed: int = 0,
+             chunk_size: Optional[int] = None) -> dict:
+    specs = game_specs(games, word_ratio, seed)
+    chunk_size = chunk_size or max(1, -(-len(specs) // workers))
+    chunks = [specs[i:i + chunk_size] for i in range(0, len(specs), chunk_size)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = [result for chunk in pool.map(play_chunk, chunks) for result in chunk]
+    wall_time = time.perf_counter() - start
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "provider": os.getenv("LLM_PROVIDER"),
+        "model": os.getenv("OPENAI_MODEL"),
+        "turn_mode": os.getenv("WORD_GAME_TURN_MODE", "text"),
+        "engine": os.getenv("WORD_GAME_ENGINE", "llm"),
+        "prompts": prompt_fingerprint(),
+        "workers": workers,
+        "wall_time_s": wall_time,
+        "summary": summarize(results),
+        "games": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes in the pool")
+    parser.add_argument("--word-ratio", type=float, default=0.5, help="share of word games")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the full report (with every game) to this JSON file")
+    args = parser.parse_args()
+
+    # Workers inherit the environment, so this selects the fake model in every process
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+
+    report = evaluate(args.games, args.workers, args.word_ratio, args.seed)
+    print(f"{args.games} games on {args.workers} workers in {report['wall_time_s']:.2f}s "
+          f"(provider={report['provider']}, prompts={report['prompts']})")
+    for game, stats in report["summary"].items():
+        print(f"  {game:<6} games={stats['games']} accuracy={stats['accuracy']:.1%} "
+              f"turns={stats['turns_mean']:.2f} llm_calls={stats['llm_calls_per_game']:.2f} "
+              f"tokens={stats['tokens_per_game']:.0f} errors={stats['errors']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Load test for the game API.
+
+Plays simulated number and word games concurrently against `main:app`
+in-process (no network, no paid model: the fake chat model is used unless
+LLM_PROVIDER is set) and reports requests/sec, latency percentiles per
+endpoint and memory per active session. Results are saved as JSON and can be
+compared with an earlier run:
+
+    PYTHONPATH=. python -m benchmarks.load_test --games 2000 --concurrency 200
+    PYTHONPATH=. python -m benchmarks.load_test --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import re
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+# Safety cap on turns per game, in case a game never reaches its end
+MAX_TURNS = 30
+
+# Environment variables recorded with every result
+CONFIG_VARS = [
+    "LLM_PROVIDER", "LLM_CACHE", "FAKE_LLM_LATENCY_MS", "FAKE_LLM_LATENCY_SIGMA",
+    "FAKE_LLM_DUPLICATE_RATE", "FAKE_LLM_ERROR_RATE", "FAKE_LLM_SEED", "SESSION_STORE",
+    "CHECKPOINTER", "WORD_GAME_ENGINE", "WORD_GAME_TURN_MODE",
+]
+
+
+class Recorder:
+    """
+    Collects per-endpoint latencies and failures.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def report(self, wall_time: float) -> dict:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(endpoint, 0),
+                "mean_ms": 1000 * sum(latencies) / len(latencies),
+                "p50_ms": 1000 * percentile(latencies, 50),
+                "p95_ms": 1000 * percentile(latencies, 95),
+                "p99_ms": 1000 * percentile(latencies, 99),
+            }
+
+        total = sum(endpoint["requests"] for endpoint in endpoints.values())
+        return {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "requests_per_second": total / wall_time if wall_time else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class GameClient:
+    """
+    One simulated player, in session mode or sending the full state each turn.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, use_sessions: bool):
+        self.client = client
+        self.recorder = recorder
+        self.use_sessions = use_sessions
+        self.session_id = None
+        self.state = {}
+
+    async def post(self, endpoint: str, payload: dict) -> dict:
+        start = time.perf_counter()
+        response = await self.client.post(endpoint, json=payload)
+        self.recorder.latencies[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.recorder.errors[endpoint] += 1
+            response.raise_for_status()
+        return response.json()
+
+    async def open(self):
+        if self.use_sessions:
+            self.session_id = (await self.post("/game/session", {}))["session_id"]
+
+    async def close(self):
+        if self.session_id:
+            await self.client.delete(f"/game/session/{self.session_id}")
+
+    async def turn(self, endpoint: str, user_input: str) -> dict:
+        if self.session_id:
+            payload = {"session_id": self.session_id, "user_input": user_input}
+        else:
+            payload = {"state": self.state, "user_input": user_input}
+
+        self.state = await self.post(endpoint, payload)
+        return self.state
+
+
+async def play_number_game(player: GameClient, rng: random.Random):
+    secret = rng.randint(1, 50)
+    await player.turn("/game/start", "1")
+    response = await player.turn("/game/number", "")
+
+    for _ in range(MAX_TURNS):
+        match = re.search(r"Is your number greater than (\d+)", " ".join(response["__messages__"]))
+        if not match:
+            return
+        response = await player.turn("/game/number", "y" if secret > int(match.group(1)) else "n")
+
+
+async def play_word_game(player: GameClient, rng: random.Random):
+    await player.turn("/game/start", "2")
+    response = await player.turn("/game/word", "")
+
+    for _ in range(MAX_TURNS):
+        messages = " ".join(response["__messages__"])
+        if "My guess is" in messages:
+            await player.turn("/game/word", rng.choice(["yes", "no"]))
+            return
+        if "(yes/no/maybe)" not in messages:
+            return
+        response = await player.turn("/game/word", rng.choice(["yes", "no", "maybe"]))
+
+
+async def run_games(client: httpx.AsyncClient, recorder: Recorder, args) -> dict:
+    rng = random.Random(args.seed)
+    games = ["word" if rng.random() < args.word_ratio else "number" for _ in range(args.games)]
+    queue = asyncio.Queue()
+    for i, game in enumerate(games):
+        queue.put_nowait((i, game))
+    failed = defaultdict(int)
+
+    async def worker():
+        while not queue.empty():
+            i, game = queue.get_nowait()
+            player = GameClient(client, recorder, args.mode == "session")
+            try:
+                await player.open()
+                play = play_word_game if game == "word" else play_number_game
+                await play(player, random.Random(args.seed + i))
+            except httpx.HTTPError:
+                failed[game] += 1
+            finally:
+                await player.close()
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return {
+        "number": games.count("number"),
+        "word": games.count("word"),
+        "failed": dict(failed),
+    }
+
+
+async def measure_session_memory(client: httpx.AsyncClient, sessions: int) -> float:
+    """
+    Traced memory per session held open at the first word game question
+    (session store snapshot plus graph checkpoints).
+    """
+    players = [GameClient(client, Recorder(), use_sessions=True) for _ in range(sessions)]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    async def open_game(player: GameClient):
+        await player.open()
+        await player.turn("/game/start", "2")
+        await player.turn("/game/word", "")
+
+    await asyncio.gather(*(open_game(player) for player in players))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    await asyncio.gather(*(player.close() for player in players))
+    return (after - before) / sessions
+
+
+async def run(args) -> dict:
+    # Imported here so the environment set from the command line is in place first
+    from main import app
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            recorder = Recorder()
+            start = time.perf_counter()
+            games = await run_games(client, recorder, args)
+            wall_time = time.perf_counter() - start
+
+            memory = None
+            if args.mode == "session" and args.memory_sessions:
+                memory = await measure_session_memory(client, args.memory_sessions)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "args": vars(args),
+        "config": {name: os.getenv(name) for name in CONFIG_VARS},
+        "games": games,
+        "wall_time_s": wall_time,
+        **recorder.report(wall_time),
+        "memory_per_session_bytes": memory,
+    }
+
+
+def compare(result: dict, baseline: dict):
+    """
+    Print the change in throughput and per-endpoint p50/p95/p99 against a baseline result.
+    """
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"requests/sec: {result['requests_per_second']:.1f} "
+          f"({change(result['requests_per_second'], baseline['requests_per_second'])})")
+    for endpoint, stats in result["endpoints"].items():
+        old = baseline["endpoints"].get(endpoint)
+        if old is None:
+            continue
+        print(f"{endpoint}: " + ", ".join(
+            f"{key} {stats[key]:.1f}ms ({change(stats[key], old[key])})" for key in ["p50_ms", "p95_ms", "p99_ms"]
+        ))
+
+
+def print_summary(result: dict):
+    print(f"{result['games']['number']} number + {result['games']['word']} word games, "
+          f"{result['requests']} requests in {result['wall_time_s']:.2f}s "
+          f"({result['requests_per_second']:.1f} req/s, {result['errors']} errors)")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"  {endpoint:<16} n={stats['requests']:<6} p50={stats['p50_ms']:.1f}ms "
+              f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms")
+    if result["memory_per_session_bytes"] is not None:
+        print(f"  memory per active session: {result['memory_per_session_bytes'] / 1024:.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--concurrency", type=int, default=100, help="games played at the same time")
+    parser.add_argument("--word-ratio", type=float, default=0.5, help="share of word games")
+    parser.add_argument("--mode", choices=["session", "state"], default="session",
+                        help="session ids, or the full state sent with every request")
+    parser.add_argument("--memory-sessions", type=int, default=200,
+                        help="sessions held open to measure memory per session (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, help="fake model median latency (FAKE_LLM_LATENCY_MS)")
+    parser.add_argument("--error-rate", type=float, help="fake model error rate (FAKE_LLM_ERROR_RATE)")
+    parser.add_argument("--output", help="result file (default benchmarks/results/load_test-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    if args.latency_ms is not None:
+        os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    if args.error_rate is not None:
+        os.environ["FAKE_LLM_ERROR_RATE"] = str(args.error_rate)
+
+    result = asyncio.run(run(args))
+    print_summary(result)
+
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), "results", f"load_test-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
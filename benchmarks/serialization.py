@@ -0,0 +1,118 @@
+"""
+Encode/decode cost per stateless game turn.
+
+Collects the states of word games played through the LangGraph app with the
+fake model and times, per turn, what the API does with them: parsing and
+validating the request body (stdlib json vs orjson) and rendering the
+response (FastAPI's jsonable_encoder + json vs GameJSONResponse), plus the
+size and time of compressing the response with gzip and brotli:
+
+    PYTHONPATH=. python -m benchmarks.serialization --games 20
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+
+from benchmarks.state_size import play_word_game, time_per_call
+
+
+async def collect_states(games: int, seed: int) -> list[dict]:
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from langgraph_core.graph.graph import workflow
+    from langgraph_core.nodes.word_game import cancel_question_prefetch
+
+    app = workflow.compile(checkpointer=MemorySaver())
+    rng = random.Random(seed)
+    states = []
+    for i in range(games):
+        states += await play_word_game(app, f"serialization-{i}", rng)
+        cancel_question_prefetch(f"serialization-{i}")
+    return states
+
+
+def run(args) -> dict:
+    # Imported here so the environment set from the command line is in place first
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from APIs.session.session_api import SessionRequest
+    from langgraph_core.game_states.compact import wire_state
+    from utils.compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+    from utils.fast_json import GameJSONResponse, loads
+
+    states = [wire_state(state) for state in asyncio.run(collect_states(args.games, args.seed))]
+    bodies = [json.dumps({"state": state, "user_input": "yes"}, default=list).encode() for state in states]
+    responses = [GameJSONResponse(state).body for state in states]
+
+    def stdlib_request(body: bytes):
+        return SessionRequest.model_validate(json.loads(body))
+
+    def orjson_request(body: bytes):
+        return SessionRequest.model_validate(loads(body))
+
+    def fastapi_response(state: dict):
+        # What FastAPI does with a returned dict: encode it, then render it with the stdlib
+        return JSONResponse(jsonable_encoder(state)).body
+
+    def game_response(state: dict):
+        return GameJSONResponse(state).body
+
+    report = {
+        "turns": len(states),
+        "request_bytes": sum(map(len, bodies)) / len(bodies),
+        "response_bytes": sum(map(len, responses)) / len(responses),
+        "request_us": {
+            "stdlib": 1e6 * time_per_call(stdlib_request, bodies),
+            "orjson": 1e6 * time_per_call(orjson_request, bodies),
+        },
+        "response_us": {
+            "fastapi": 1e6 * time_per_call(fastapi_response, states),
+            "orjson": 1e6 * time_per_call(game_response, states),
+        },
+        "gzip": {
+            "bytes": sum(len(gzip.compress(body, GZIP_LEVEL)) for body in responses) / len(responses),
+            "us": 1e6 * time_per_call(lambda body: gzip.compress(body, GZIP_LEVEL), responses),
+        },
+    }
+    if brotli is not None:
+        report["br"] = {
+            "bytes": sum(len(brotli.compress(body, quality=BROTLI_QUALITY)) for body in responses) / len(responses),
+            "us": 1e6 * time_per_call(lambda body: brotli.compress(body, quality=BROTLI_QUALITY), responses),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+
+    report = run(args)
+    request, response = report["request_us"], report["response_us"]
+    print(f"{report['turns']} turns, request {report['request_bytes']:.0f} B, "
+          f"response {report['response_bytes']:.0f} B")
+    print(f"  request decode + validate   stdlib {request['stdlib']:7.1f} us   orjson {request['orjson']:7.1f} us")
+    print(f"  response encode            fastapi {response['fastapi']:7.1f} us   orjson {response['orjson']:7.1f} us")
+    for encoding in ("gzip", "br"):
+        if encoding in report:
+            stats = report[encoding]
+            print(f"  {encoding:<4} {stats['bytes']:6.0f} B "
+                  f"({stats['bytes'] / report['response_bytes']:.0%}) in {stats['us']:6.1f} us")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
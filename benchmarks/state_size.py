@@ -0,0 +1,186 @@
+"""
+Size and serialization cost of the word game state, full vs compact.
+
+Plays word games through the LangGraph app with the fake model and, for every
+turn's state, measures the JSON sent to stateless clients and stored by the
+SQLite session store, the in-process size of a session store entry, the
+encode/decode time per turn and the graph checkpoint bytes written per game,
+once with the full `WordGameAgent` and once with the compact encoding
+(`langgraph_core/game_states/compact.py`):
+
+    PYTHONPATH=. python -m benchmarks.state_size --games 50
+    QUESTION_BANK_PATH=/tmp/bank.json PYTHONPATH=. python -m benchmarks.state_size
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+# Turns per game before giving up, in case a game never reaches its guess
+MAX_TURNS = 30
+
+
+def deep_size(obj, seen=None) -> int:
+    """
+    Bytes held by an object and everything it refers to (shared objects counted once).
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+
+
+def saved_bytes(obj) -> int:
+    """
+    Serialized bytes held by a checkpoint saver's storage.
+    """
+    if isinstance(obj, bytes):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(saved_bytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(saved_bytes(item) for item in obj)
+    return 0
+
+
+def checkpoint_bytes(saver) -> int:
+    return saved_bytes(saver.storage) + saved_bytes(saver.blobs) + saved_bytes(saver.writes)
+
+
+async def play_word_game(app, thread_id: str, rng: random.Random) -> list[dict]:
+    """
+    Play one word game with random answers and return the state after every turn.
+    """
+    from langgraph.types import Command
+
+    config = {"configurable": {"thread_id": thread_id}}
+    result = await app.ainvoke({
+        "game_choice": None,
+        "number_game_state": None,
+        "word_game_state": None,
+        "__messages__": [],
+        "__user_input__": "2"
+    }, config)
+    result = await app.ainvoke(Command(resume=""), config)
+
+    states = []
+    for _ in range(MAX_TURNS):
+        states.append({key: value for key, value in result.items() if key != "__interrupt__"})
+        if result.get("phase") != "word_answer":
+            break
+        result = await app.ainvoke(Command(resume=rng.choice(["yes", "no", "maybe"])), config)
+    return states
+
+
+def time_per_call(func, items: list, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, (time.perf_counter() - start) / len(items))
+    return best
+
+
+async def run(args) -> dict:
+    # Imported here so the environment set from the command line is in place first
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    from langgraph_core.game_states.compact import (
+        CompactSerializer, full_state, is_word_game_state, pack_word_game, stored_state
+    )
+    from langgraph_core.graph.graph import workflow
+    from langgraph_core.nodes.word_game import cancel_question_prefetch
+
+    def full_json(state) -> str:
+        return json.dumps(state, default=list, separators=(",", ":"))
+
+    def full_load(payload: str):
+        state = json.loads(payload)
+        state["word_game_state"]["asked_set"] = set(state["word_game_state"]["asked_set"])
+        return state
+
+    def compact_json(state) -> str:
+        return full_json({**state, "word_game_state": pack_word_game(state["word_game_state"])})
+
+    encodings = {
+        "full": {"dump": full_json, "load": full_load, "store": lambda state: state, "serde": JsonPlusSerializer()},
+        "compact": {"dump": compact_json, "load": lambda payload: full_state(json.loads(payload)),
+                    "store": stored_state, "serde": CompactSerializer()},
+    }
+
+    report = {}
+    for name, encoding in encodings.items():
+        saver = MemorySaver(serde=encoding["serde"])
+        app = workflow.compile(checkpointer=saver)
+        rng = random.Random(args.seed)
+
+        states, game_bytes = [], []
+        for i in range(args.games):
+            before = checkpoint_bytes(saver)
+            thread_id = f"size-{name}-{i}"
+            states += await play_word_game(app, thread_id, rng)
+            cancel_question_prefetch(thread_id)
+            game_bytes.append(checkpoint_bytes(saver) - before)
+
+        states = [state for state in states if is_word_game_state(state.get("word_game_state"))]
+        payloads = [encoding["dump"](state) for state in states]
+        channel_values = [encoding["serde"].dumps_typed(state["word_game_state"]) for state in states]
+
+        report[name] = {
+            "turns": len(states),
+            "json_bytes_per_turn": sum(map(len, payloads)) / len(payloads),
+            "json_bytes_max": max(map(len, payloads)),
+            "memory_bytes_per_session": sum(deep_size(encoding["store"](state)) for state in states) / len(states),
+            "checkpoint_bytes_per_game": sum(game_bytes) / len(game_bytes),
+            "json_encode_us": 1e6 * time_per_call(encoding["dump"], states),
+            "json_decode_us": 1e6 * time_per_call(encoding["load"], payloads),
+            "checkpoint_encode_us": 1e6 * time_per_call(
+                lambda state: encoding["serde"].dumps_typed(state["word_game_state"]), states
+            ),
+            "checkpoint_decode_us": 1e6 * time_per_call(encoding["serde"].loads_typed, channel_values),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+
+    report = asyncio.run(run(args))
+    full, compact = report["full"], report["compact"]
+    print(f"{args.games} word games, {full['turns']} turns")
+    print(f"  {'':<28}{'full':>10}{'compact':>10}{'change':>9}")
+    for key in full:
+        if key == "turns":
+            continue
+        change = (compact[key] - full[key]) / full[key] if full[key] else 0.0
+        print(f"  {key:<28}{full[key]:>10.1f}{compact[key]:>10.1f}{change:>+9.1%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Compact encoding of the word game state.
+
+A full `WordGameAgent` repeats the word list and every question (twice, with
+`asked_set`) on each round trip. The compact form refers to a known word list
+(the game's own, registered at import, or one from the question bank file) by
+its hash, and to banked questions by their id in the bank file's append-only
+question list. Other word lists and questions are sent inline, so any process
+can decode the state, also after a restart. Yes/no/maybe answers are stored as
+small ints and the candidates as a bitmask over the word list, and `asked_set`
+is left out, as it is rebuilt from the questions.
+Nodes keep working on the full dict; states are packed where they leave the
+process (API responses, the session store, graph checkpoints) and unpacked
+where they come back.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from langgraph_core.game_states.game_state import GameState
+from langgraph_core.nodes.question_bank import bank_word_list, question_id, question_text, word_list_key
+
+compact_enabled = os.getenv("COMPACT_STATE", "true").lower() == "true"
+
+ANSWER_CODES = ["yes", "no", "maybe"]
+ANSWER_IDS = {answer: i for i, answer in enumerate(ANSWER_CODES)}
+
+# Keys of WordGameAgent with a compact encoding; any other key is kept as is
+PACKED_KEYS = frozenset({
+    "words", "max_number_of_questions", "current_question_index", "questions", "answers", "guess", "asked_set",
+    "candidates"
+})
+# Keys of the wire form
+WIRE_KEYS = frozenset({"list", "max", "index", "q", "a", "guess", "cand", "asked"})
+
+# word-list hash -> word list, for the lists defined in code
+_word_lists: dict[str, list[str]] = {}
+
+
+def register_word_list(words: list[str]) -> str:
+    """
+    Make a word list defined in code decodable from its id, and return the id.
+    Only register lists every process registers the same way (e.g. at import).
+    """
+    list_id = word_list_key(words)
+    if list_id not in _word_lists:
+        _word_lists[list_id] = list(words)
+    return list_id
+
+
+def word_list(list_id: str) -> list[str]:
+    words = _word_lists.get(list_id) or bank_word_list(list_id)
+    if words is None:
+        raise ValueError(f"Unknown word list: {list_id}")
+    return words
+
+
+def pack_word_list(words: list[str]) -> Union[str, list[str]]:
+    """
+    The id of a known word list, or the list itself.
+    """
+    list_id = word_list_key(words)
+    if _word_lists.get(list_id) == words or bank_word_list(list_id) == words:
+        return list_id
+    return list(words)
+
+
+def unpack_word_list(packed: Union[str, list[str]]) -> list[str]:
+    return word_list(packed) if isinstance(packed, str) else list(packed)
+
+
+def pack_question(question: str) -> Union[int, str]:
+    packed = question_id(question)
+    return question if packed is None else packed
+
+
+def unpack_question(question: Union[int, str]) -> str:
+    if isinstance(question, int):
+        try:
+            return question_text(question)
+        except IndexError:
+            raise ValueError(f"Unknown question id: {question}") from None
+    return question
+
+
+def is_word_game_state(value) -> bool:
+    return isinstance(value, dict) and "words" in value
+
+
+def is_packed_word_game(value) -> bool:
+    return isinstance(value, dict) and "list" in value
+
+
+def pack_wire(wg: dict) -> dict:
+    """
+    The compact wire form of a full word game state. Optional fields are left
+    out when empty and keys without a compact encoding are copied as is.
+    """
+    words = wg["words"]
+    questions = wg.get("questions", [])
+    wire = {
+        "list": pack_word_list(words),
+        "max": wg["max_number_of_questions"],
+        "index": wg["current_question_index"],
+        "q": [pack_question(question) for question in questions],
+        "a": [ANSWER_IDS.get(answer, answer) for answer in wg.get("answers", [])],
+        "guess": wg.get("guess")
+    }
+
+    candidates = wg.get("candidates")
+    if candidates is not None:
+        if all(word in words for word in candidates):
+            candidates = sum(1 << words.index(word) for word in candidates)
+        wire["cand"] = candidates
+
+    asked = set(wg.get("asked_set", ())).difference(questions)
+    if asked:
+        wire["asked"] = sorted(asked)
+
+    for key, value in wg.items():
+        if key not in PACKED_KEYS:
+            wire[key] = value
+    return wire
+
+
+def unpack_wire(wire: dict) -> dict:
+    """
+    The full word game state for its wire form.
+    """
+    words = unpack_word_list(wire["list"])
+    questions = [unpack_question(question) for question in wire.get("q", [])]
+    wg = {
+        "words": words,
+        "max_number_of_questions": wire["max"],
+        "current_question_index": wire["index"],
+        "questions": questions,
+        "answers": [ANSWER_CODES[answer] if isinstance(answer, int) else answer for answer in wire.get("a", [])],
+        "guess": wire.get("guess"),
+        "asked_set": set(questions).union(wire["asked"]) if "asked" in wire else set(questions)
+    }
+
+    candidates = wire.get("cand")
+    if isinstance(candidates, int):
+        wg["candidates"] = [word for i, word in enumerate(words) if candidates >> i & 1]
+    elif candidates is not None:
+        wg["candidates"] = list(candidates)
+
+    for key, value in wire.items():
+        if key not in WIRE_KEYS:
+            wg[key] = value
+    return wg
+
+
+@dataclass(slots=True)
+class CompactWordGame:
+    """
+    A word game state held in process memory in compact form, with the fields
+    of its wire form: `word_list` is a known list's id or the list itself,
+    `questions` hold bank ids (ints) or the question text,
+    `answers` indexes into ANSWER_CODES or the raw answer, and `candidates` is
+    a bitmask over the word list (None when not set).
+    """
+    word_list: Union[str, list[str]]
+    max_questions: int
+    index: int
+    questions: list
+    answers: list
+    guess: Optional[str] = None
+    candidates: Optional[Union[int, list[str]]] = None
+    # Asked questions that are not in `questions` (normally none)
+    asked: list = field(default_factory=list)
+    # confidence, planned_question, planned_guess, word_list_shown, ...
+    extras: dict = field(default_factory=dict)
+
+    @classmethod
+    def pack(cls, wg: dict) -> "CompactWordGame":
+        return cls.from_wire(pack_wire(wg))
+
+    def unpack(self) -> dict:
+        return unpack_wire(self.to_wire())
+
+    def to_wire(self) -> dict:
+        wire = {"list": self.word_list, "max": self.max_questions, "index": self.index,
+                "q": self.questions, "a": self.answers, "guess": self.guess}
+        if self.candidates is not None:
+            wire["cand"] = self.candidates
+        if self.asked:
+            wire["asked"] = self.asked
+        wire.update(self.extras)
+        return wire
+
+    @classmethod
+    def from_wire(cls, wire: dict) -> "CompactWordGame":
+        return cls(
+            word_list=wire["list"],
+            max_questions=wire["max"],
+            index=wire["index"],
+            questions=list(wire.get("q", [])),
+            answers=list(wire.get("a", [])),
+            guess=wire.get("guess"),
+            candidates=wire.get("cand"),
+            asked=list(wire.get("asked", [])),
+            extras={key: value for key, value in wire.items() if key not in WIRE_KEYS}
+        )
+
+
+def pack_word_game(wg):
+    """
+    The wire form of a word game state, whether it is a full dict or a CompactWordGame.
+    Anything else (None, {}, an already packed dict) is returned as is.
+    """
+    if isinstance(wg, CompactWordGame):
+        return wg.to_wire()
+    if is_word_game_state(wg):
+        return pack_wire(wg)
+    return wg
+
+
+def unpack_word_game(wg):
+    """
+    The full dict form of a word game state sent in wire form (or held as a CompactWordGame).
+    """
+    if isinstance(wg, CompactWordGame):
+        return wg.unpack()
+    if is_packed_word_game(wg):
+        return unpack_wire(wg)
+    return wg
+
+
+def _map_word_game(state, convert):
+    if not isinstance(state, dict) or not state.get("word_game_state"):
+        return state
+    return {**state, "word_game_state": convert(state["word_game_state"])}
+
+
+def wire_state(state: GameState) -> GameState:
+    """
+    Copy of a state with its word game in compact wire form, for API responses and storage.
+    """
+    return _map_word_game(state, pack_word_game if compact_enabled else unpack_word_game)
+
+
+def full_state(state: GameState) -> GameState:
+    """
+    Copy of a state received in wire form (compact or not) with its word game unpacked.
+    """
+    return _map_word_game(state, unpack_word_game)
+
+
+def stored_state(state: GameState) -> GameState:
+    """
+    Copy of a state to keep in memory, with its word game held as a CompactWordGame.
+    """
+    if not compact_enabled:
+        return state
+    return _map_word_game(state, lambda wg: CompactWordGame.pack(wg) if is_word_game_state(wg) else wg)
+
+
+class CompactSerializer(SerializerProtocol):
+    """
+    Checkpoint serializer that stores word game states in compact form.
+    The savers hand it a single channel value (the word game state itself),
+    a whole checkpoint with its `channel_values`, or checkpoint metadata with
+    the state each node wrote.
+    """
+
+    def __init__(self, serde: Optional[SerializerProtocol] = None):
+        self.serde = serde or JsonPlusSerializer()
+
+    @staticmethod
+    def _convert(obj: Any, convert) -> Any:
+        if is_word_game_state(obj) or is_packed_word_game(obj):
+            return convert(obj)
+        if not isinstance(obj, dict):
+            return obj
+        if isinstance(obj.get("channel_values"), dict):
+            return {**obj, "channel_values": _map_word_game(obj["channel_values"], convert)}
+        if isinstance(obj.get("writes"), dict):
+            writes = {node: _map_word_game(state, convert) for node, state in obj["writes"].items()}
+            return {**obj, "writes": writes}
+        return obj
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(self._convert(obj, pack_word_game))
+
+    def loads(self, data: bytes) -> Any:
+        return self._convert(self.serde.loads(data), unpack_word_game)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        return self.serde.dumps_typed(self._convert(obj, pack_word_game))
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        return self._convert(self.serde.loads_typed(data), unpack_word_game)
@@ -5,6 +5,17 @@ from langgraph_core.game_states.number_game_state import NumberGameAgent
 from langgraph_core.game_states.word_game_state import WordGameAgent
 
 
+# What the game waits for from the player next, set by the node that prompts for it
+Phase = Literal[
+    "select_game",     # 1 (number game) or 2 (word game)
+    "number_answer",   # y/n to "Is your number greater than ...?"
+    "word_ready",      # the player has picked a word from the list
+    "word_answer",     # yes/no/maybe to a question about the word
+    "guess_feedback",  # yes/no to "Was I correct?"
+    "play_again",      # yes/no to "Would you like to play again?"
+]
+
+
 class GameState(TypedDict, total=False):
     """
     Main game state that includes both game types and tracking info.
@@ -14,10 +25,12 @@ class GameState(TypedDict, total=False):
     word_game_state: Optional[WordGameAgent]
     word_game_count: int
     number_game_count: int
+    phase: Phase
 
     # API interaction fields
     __user_input__: str
     __messages__: list[str]
+    __turn_id__: str  # session mode: the id of the last turn played
 
 
 def create_initial_state() -> GameState:
@@ -30,6 +43,30 @@ def create_initial_state() -> GameState:
         "word_game_state": None,
         "word_game_count": 0,
         "number_game_count": 0,
+        "phase": "select_game",
         "__messages__": [],
         "__user_input__": ""
-    }
\ No newline at end of file
+    }
+
+
+def infer_phase(state: GameState) -> Phase:
+    """
+    Phase of a state sent by a client from before the phase field, read from
+    the last turn's messages.
+    """
+    text = " ".join(state.get("__messages__", [])).lower()
+    if "play again" in text or "play another game" in text:
+        return "play_again"
+    if "was i correct?" in text:
+        return "guess_feedback"
+    if "(yes/no/maybe)" in text:
+        return "word_answer"
+    if "think of a word" in text:
+        return "word_ready"
+    if "is your number greater than" in text:
+        return "number_answer"
+    return "select_game"
+
+
+def current_phase(state: GameState) -> Phase:
+    return state.get("phase") or infer_phase(state)
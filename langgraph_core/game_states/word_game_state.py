@@ -1,4 +1,4 @@
-from typing import TypedDict, Annotated, Optional
+from typing import TypedDict, Annotated, Optional, NotRequired
 import operator
 
 
@@ -12,4 +12,10 @@ class WordGameAgent(TypedDict):
     questions: Annotated[list[str], operator.add]
     answers: Annotated[list[str], operator.add]
     guess: Optional[str]
-    asked_set: set[str]
\ No newline at end of file
+    asked_set: set[str]
+    # Probability of the most likely word after the last answer
+    confidence: NotRequired[float]
+    # Structured turns: words still consistent with the answers, and the planned next step
+    candidates: NotRequired[list[str]]
+    planned_question: NotRequired[Optional[str]]
+    planned_guess: NotRequired[Optional[str]]
\ No newline at end of file
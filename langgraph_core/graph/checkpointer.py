@@ -0,0 +1,97 @@
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+from langgraph_core.game_states.compact import CompactSerializer, compact_enabled
+
+checkpointer_backend = os.getenv("CHECKPOINTER", "memory")
+checkpoint_db_path = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db")
+
+# Keep every checkpoint of a session thread instead of only the latest one
+keep_checkpoint_history = os.getenv("CHECKPOINT_KEEP_HISTORY", "false").lower() == "true"
+
+
+def checkpoint_serde():
+    # None keeps the savers' default serializer
+    return CompactSerializer() if compact_enabled else None
+
+
+def create_checkpointer(backend: str = checkpointer_backend) -> BaseCheckpointSaver:
+    """
+    Build the checkpointer selected by the CHECKPOINTER environment variable.
+    """
+    if backend == "memory":
+        return MemorySaver(serde=checkpoint_serde())
+    if backend == "sqlite":
+        # Optional dependency: langgraph-checkpoint-sqlite
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        return SqliteSaver(sqlite3.connect(checkpoint_db_path, check_same_thread=False), serde=checkpoint_serde())
+    raise ValueError(f"Unknown checkpointer backend: {backend}")
+
+
+@asynccontextmanager
+async def async_checkpointer(backend: str = checkpointer_backend):
+    """
+    Open the checkpointer for the async request path for the duration of the
+    block, closing its connection on exit. The SQLite saver binds to the
+    running event loop, so this must be entered at application startup.
+    """
+    if backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        async with aiosqlite.connect(checkpoint_db_path) as conn:
+            yield AsyncSqliteSaver(conn, serde=checkpoint_serde())
+    else:
+        yield checkpointer
+
+
+def prune_memory_thread(saver: MemorySaver, thread_id: str):
+    for checkpoint_ns, checkpoints in saver.storage.get(thread_id, {}).items():
+        if not checkpoints:
+            continue
+
+        latest = max(checkpoints)
+        versions = saver.serde.loads_typed(checkpoints[latest][0])["channel_versions"]
+        for checkpoint_id in [checkpoint_id for checkpoint_id in checkpoints if checkpoint_id != latest]:
+            # Every blob belongs to a version listed by the checkpoint that wrote it
+            old_versions = saver.serde.loads_typed(checkpoints.pop(checkpoint_id)[0])["channel_versions"]
+            for channel, version in old_versions.items():
+                if versions.get(channel) != version:
+                    saver.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+            saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+
+async def aprune_thread(saver: BaseCheckpointSaver, thread_id: str):
+    """
+    Drop every checkpoint of a thread but the latest, along with the writes
+    and channel values only the older ones used. Resuming or updating the
+    thread only reads the latest checkpoint and its pending writes, so a
+    session keeps a constant amount of checkpoint data however long it plays.
+    """
+    if isinstance(saver, MemorySaver):
+        prune_memory_thread(saver, thread_id)
+        return
+
+    # Optional dependency: langgraph-checkpoint-sqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    if isinstance(saver, AsyncSqliteSaver):
+        async with saver.lock, saver.conn.cursor() as cur:
+            for table in ("writes", "checkpoints"):
+                await cur.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id < ("
+                    "SELECT MAX(checkpoint_id) FROM checkpoints AS latest "
+                    f"WHERE latest.thread_id = {table}.thread_id AND latest.checkpoint_ns = {table}.checkpoint_ns)",
+                    (thread_id,)
+                )
+            await saver.conn.commit()
+
+
+# The graph is compiled with this one. The API and the evaluator replace it with
+# their async_checkpointer, so with SQLite no sync connection is opened for them.
+checkpointer = create_checkpointer("memory" if checkpointer_backend == "sqlite" else checkpointer_backend)
@@ -1,18 +1,57 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from langgraph_core.game_states.game_state import GameState
+from langgraph_core.graph.checkpointer import checkpointer
+from langgraph_core.nodes.human import await_input, await_play_again
 from langgraph_core.nodes.selector import game_selector
 from langgraph_core.nodes.number_game import choose_number, guess_number
-from langgraph_core.nodes.word_game import choose_word, ask_questions, guess_word
+from langgraph_core.nodes.word_game import (
+    choose_word,
+    ask_questions,
+    aask_questions,
+    guess_word,
+    aguess_word,
+    check_guess,
+    record_word_answer,
+    arecord_word_answer,
+    ready_to_guess
+)
+from utils.metrics import metrics_enabled, timed_node
+from utils.tracing import traced_node, tracing_enabled
 
 workflow = StateGraph(GameState)
 
+
+def add_node(name: str, func, afunc=None):
+    """
+    Register a node, timed when metrics are enabled and traced when tracing is.
+    Nodes with an async variant run it under app.ainvoke and the sync one under app.invoke.
+    """
+    if metrics_enabled:
+        func = timed_node(name, func)
+        afunc = timed_node(name, afunc) if afunc else None
+    if tracing_enabled:
+        func = traced_node(name, func)
+        afunc = traced_node(name, afunc) if afunc else None
+    workflow.add_node(name, RunnableLambda(func, afunc=afunc) if afunc else func)
+
+
 # Add nodes
-workflow.add_node("game_selector", game_selector)
-workflow.add_node("choose_number", choose_number)
-workflow.add_node("guess_number", guess_number)
-workflow.add_node("choose_word", choose_word)
-workflow.add_node("ask_questions", ask_questions)
-workflow.add_node("guess_word", guess_word)
+add_node("game_selector", game_selector)
+add_node("choose_number", choose_number)
+add_node("guess_number", guess_number)
+add_node("choose_word", choose_word)
+add_node("ask_questions", ask_questions, aask_questions)
+add_node("record_word_answer", record_word_answer, arecord_word_answer)
+add_node("guess_word", guess_word, aguess_word)
+add_node("check_guess", check_guess)
+
+# Human-in-the-loop pauses: each one interrupts the run until the next turn resumes it
+add_node("await_number_answer", await_input)
+add_node("await_word_ready", await_input)
+add_node("await_word_answer", await_input)
+add_node("await_guess_feedback", await_input)
+add_node("await_play_again", await_play_again)
 
 # Set entry point
 workflow.set_entry_point("game_selector")
@@ -29,48 +68,47 @@ workflow.add_conditional_edges(
     }
 )
 
-# Number game logic
-workflow.add_conditional_edges(
-    "choose_number",
-    lambda state: state.get("number_game_state", {}).get("next_step"),
-    {"Number chosen": "guess_number"}
-)
+# Number game logic: choose_number → guess_number ⇄ await_number_answer
+workflow.add_edge("choose_number", "guess_number")
 
 workflow.add_conditional_edges(
     "guess_number",
     lambda state: state.get("number_game_state", {}).get("next_step"),
-    {"guessing": "guess_number"}
+    {
+        "guessing": "await_number_answer",
+        "guessed number": "await_play_again"
+    }
 )
 
-workflow.add_edge("guess_number", "game_selector")
+workflow.add_edge("await_number_answer", "guess_number")
 
 
-# choose_word → ask_questions
-workflow.add_conditional_edges(
-    "choose_word",
-    lambda state: state.get("word_game_state", {}).get("next_step"),
-    {"Word chosen": "ask_questions"}
-)
+# choose_word → (player picks a word) → ask_questions
+workflow.add_edge("choose_word", "await_word_ready")
+workflow.add_edge("await_word_ready", "ask_questions")
 
-# ask_questions → ask_questions OR guess_word
+# ask_questions → (player answers) → ask_questions OR guess_word
+workflow.add_edge("ask_questions", "await_word_answer")
+workflow.add_edge("await_word_answer", "record_word_answer")
 workflow.add_conditional_edges(
-    "ask_questions",
-    lambda state: (
-        "ask_questions" if state.get("word_game_state", {}).get("current_question_index", 0) <
-                          state.get("word_game_state", {}).get("max_number_of_questions", 5)
-        else "guess_word"
-    ),
+    "record_word_answer",
+    lambda state: "guess_word" if ready_to_guess(state["word_game_state"]) else "ask_questions",
     {
         "ask_questions": "ask_questions",
         "guess_word": "guess_word"
     }
 )
 
-# guess_word → game_selector
-workflow.add_edge("guess_word", "game_selector")
+# guess_word → (player confirms) → check_guess → play again?
+workflow.add_edge("guess_word", "await_guess_feedback")
+workflow.add_edge("await_guess_feedback", "check_guess")
+workflow.add_edge("check_guess", "await_play_again")
+
+# play again → game_selector
+workflow.add_edge("await_play_again", "game_selector")
 
-# Compile
-app = workflow.compile()
+# Compile with a checkpointer so runs pause at the await_* nodes and resume per thread id
+app = workflow.compile(checkpointer=checkpointer)
 
 # Optional: Mermaid diagram output
 try:
@@ -8,6 +8,7 @@ def exit_game(state: GameState) -> GameState:
     number_games = state.get("number_game_count", 0)
     word_games = state.get("word_game_count", 0)
 
+    state["phase"] = "select_game"
     state["__messages__"] = [
         f"Thanks for playing!",
         f"You played {number_games} Number Guessing Games and {word_games} Word Clue Guesser Games in this session."
@@ -0,0 +1,21 @@
+from langgraph.types import interrupt
+
+from langgraph_core.game_states.game_state import GameState
+
+
+def await_input(state: GameState) -> GameState:
+    """
+    Pause the graph until the player replies to the current messages.
+    The reply is passed back with Command(resume=...) on the same thread.
+    """
+    state["__user_input__"] = str(interrupt(state.get("__messages__", []))).strip().lower()
+    return state
+
+
+def await_play_again(state: GameState) -> GameState:
+    """
+    Wait for the answer to "Would you like to play again?" and hand it to the selector.
+    """
+    state = await_input(state)
+    state["game_choice"] = "retry"
+    return state
@@ -1,4 +1,4 @@
-from langgraph_core.game_states.game_state import GameState
+from langgraph_core.game_states.game_state import GameState, current_phase
 
 
 def choose_number(state: GameState) -> GameState:
@@ -23,11 +23,7 @@ def guess_number(state: GameState) -> GameState:
     user_input = state.get("__user_input__", "").lower()
     messages = []
 
-    all_messages = state.get("__messages__", [])
-    is_play_again_question = any("play again" in msg.lower() for msg in all_messages) or any(
-        "play another game" in msg.lower() for msg in all_messages)
-
-    if is_play_again_question:
+    if current_phase(state) == "play_again":
         if user_input in ["yes", "y"]:
             state["game_choice"] = "retry"
         else:
@@ -57,10 +53,12 @@ def guess_number(state: GameState) -> GameState:
         messages.append(f"Your number is {min_val}!")
         messages.append("Would you like to play again?")
         ng["next_step"] = "guessed number"
+        state["phase"] = "play_again"
     else:
         mid = (min_val + max_val) // 2
         messages.append(f"Is your number greater than {mid}? (y/n)")
         ng["next_step"] = "guessing"
+        state["phase"] = "number_answer"
 
     state["__messages__"] = messages
     return state
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""
+Precomputed word game questions.
+
+A bank holds, for one word list, the question to ask after every sequence of
+answered questions: a tree with a question per node and a child per answer
+(yes/no/maybe), built offline with the model or the local engine. At runtime
+the tree is flattened into an index keyed by (word-list hash, answered QA
+prefix), so games over a banked word list ask their questions without an LLM
+call. Build (or rebuild) the bank for the game's word list with:
+
+    PYTHONPATH=. python -m langgraph_core.nodes.question_bank --source model
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+from langgraph_core.nodes.word_engine import MAYBE, NO, YES, answer_outcome
+from utils.metrics import CallbackCounter, metrics_enabled, registry
+
+bank_enabled = os.getenv("QUESTION_BANK", "true").lower() == "true"
+bank_path = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "question_bank.json")
+)
+
+ANSWERS = {YES: "yes", NO: "no", MAYBE: "maybe"}
+
+# (word-list hash, ((question, answer), ...)) -> next question
+_index: dict[tuple[str, tuple], str] = {}
+# word-list hash -> number of questions per game the bank was built for
+_max_questions: dict[str, int] = {}
+# Every banked question, numbered in the order it was first saved (compact game states refer to these ids)
+_question_texts: list[str] = []
+_question_ids: dict[str, int] = {}
+# word-list hash -> word list, for every bank in the file (compact game states refer to these hashes)
+_bank_word_lists: dict[str, list[str]] = {}
+
+bank_stats = {"hits": 0, "misses": 0}
+
+if metrics_enabled:
+    registry.register(CallbackCounter(
+        "question_bank_lookups_total", "Word game question bank lookups", ("result",),
+        lambda: {("hit",): bank_stats["hits"], ("miss",): bank_stats["misses"]}
+    ))
+
+
+@functools.lru_cache(maxsize=64)
+def _word_list_key(words: tuple) -> str:
+    return hashlib.sha256("\x00".join(word.lower() for word in words).encode()).hexdigest()[:16]
+
+
+def word_list_key(words: list[str]) -> str:
+    return _word_list_key(tuple(words))
+
+
+def qa_prefix(questions: list[str], answers: list[str]) -> tuple:
+    return tuple((question, ANSWERS[answer_outcome(answer)]) for question, answer in zip(questions, answers))
+
+
+def add_question_id(question: str):
+    if question not in _question_ids:
+        _question_ids[question] = len(_question_texts)
+        _question_texts.append(question)
+
+
+def question_id(question: str) -> Optional[int]:
+    return _question_ids.get(question)
+
+
+def question_text(question_id: int) -> str:
+    return _question_texts[question_id]
+
+
+def bank_word_list(key: str) -> Optional[list[str]]:
+    return _bank_word_lists.get(key)
+
+
+def index_tree(key: str, node: Optional[dict], prefix: tuple = ()):
+    if not node:
+        return
+    _index[(key, prefix)] = node["question"]
+    for answer, child in node.get("next", {}).items():
+        index_tree(key, child, prefix + ((node["question"], answer),))
+
+
+def load_question_bank(path: str = bank_path) -> int:
+    """
+    (Re)load the bank file into the in-memory index. Returns the number of indexed questions.
+
+    Question ids and bank word lists are loaded even when the bank is turned
+    off, and kept when a reload fails: saved game states refer to them.
+    """
+    _index.clear()
+    _max_questions.clear()
+    if not os.path.exists(path):
+        return 0
+
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        banks = data["banks"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error loading question bank: {str(e)}")
+        return 0
+
+    # The file's question list only grows, so reloading it keeps every id already handed out
+    for question in data.get("questions") or [
+        # Files from before the question list number their questions in tree order
+        question for bank in banks.values() for question in tree_questions(bank["tree"])
+    ]:
+        add_question_id(question)
+    for key, bank in banks.items():
+        _bank_word_lists[key] = list(bank["words"])
+
+    if not bank_enabled:
+        return 0
+    for key, bank in banks.items():
+        _max_questions[key] = bank["max_questions"]
+        index_tree(key, bank["tree"])
+    return len(_index)
+
+
+load_question_bank()
+
+
+def has_bank(wg) -> bool:
+    return _max_questions.get(word_list_key(wg["words"])) == wg["max_number_of_questions"]
+
+
+def bank_question(wg) -> Optional[str]:
+    """
+    The banked question for this game position, or None if the bank does not
+    cover it. A question served from the bank is recorded as asked.
+    """
+    if not _index or not has_bank(wg):
+        return None
+
+    question = _index.get((word_list_key(wg["words"]), qa_prefix(wg["questions"], wg["answers"])))
+    if question is None:
+        bank_stats["misses"] += 1
+        return None
+
+    bank_stats["hits"] += 1
+    wg.setdefault("asked_set", set()).add(question)
+    return question
+
+
+async def generate_question(wg, source: str) -> Optional[str]:
+    from langgraph_core.nodes.word_game import (
+        TURN_CALL, aget_question, fallback_question, format_turn_prompt, is_duplicate_question
+    )
+    from langgraph_core.prompts.wg_prompts import WordGameTurn
+    from utils.model import model
+
+    if source == "engine":
+        return fallback_question(wg)
+
+    # The turn prompt sees the answers, so each branch of the tree gets its own question
+    try:
+        turn = await model.with_structured_output(WordGameTurn).ainvoke(format_turn_prompt(wg), TURN_CALL)
+        question = (turn.next_question or "").strip()
+        if question and not is_duplicate_question(question, wg["asked_set"]):
+            return question
+    except Exception as e:
+        print(f"Error planning word game turn: {str(e)}")
+    return await aget_question(wg, fallback=False)
+
+
+async def build_tree(words: list[str], max_questions: int, source: str = "model", concurrency: int = 8) -> dict:
+    """
+    Generate the question tree for a word list, one question per answered QA prefix.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def node(questions: list[str], answers: list[str]) -> Optional[dict]:
+        wg = {
+            "words": words,
+            "max_number_of_questions": max_questions,
+            "current_question_index": len(questions),
+            "questions": list(questions),
+            "answers": list(answers),
+            "asked_set": set(questions)
+        }
+        async with semaphore:
+            question = await generate_question(wg, source)
+        if question is None:
+            return None
+
+        # The answer to the last question leads to the guess, not another question
+        if len(questions) + 1 >= max_questions:
+            return {"question": question}
+        children = await asyncio.gather(*(
+            node(questions + [question], answers + [answer]) for answer in ANSWERS.values()
+        ))
+        return {"question": question, "next": {
+            answer: child for answer, child in zip(ANSWERS.values(), children) if child
+        }}
+
+    return await node([], [])
+
+
+def save_bank(words: list[str], max_questions: int, source: str, tree: dict, path: str = bank_path):
+    """
+    Add (or replace) a word list's bank in the bank file.
+    """
+    banks, questions = {}, []
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+        banks = data["banks"]
+        # Files from before the question list number their questions in tree order when loaded
+        questions = data.get("questions") or [
+            question for bank in banks.values() for question in tree_questions(bank["tree"])
+        ]
+
+    from utils.model import model_name
+    banks[word_list_key(words)] = {
+        "words": list(words),
+        "max_questions": max_questions,
+        "source": source if source == "engine" else f"model:{model_name}",
+        "built_at": time.time(),
+        "tree": tree
+    }
+    # The question list only grows, so ids held by saved game states stay valid across rebuilds
+    questions = list(dict.fromkeys(questions + list(tree_questions(tree))))
+
+    with open(path, "w") as f:
+        json.dump({"questions": questions, "banks": banks}, f, indent=1)
+
+
+async def warm_question_bank(words: list[str], max_questions: int, source: str = "model"):
+    """
+    Build and load the bank for a word list that does not have one yet.
+    """
+    wg = {"words": words, "max_number_of_questions": max_questions}
+    if has_bank(wg):
+        return
+    try:
+        tree = await build_tree(words, max_questions, source)
+        save_bank(words, max_questions, source, tree)
+        print(f"Built question bank for {len(words)} words ({load_question_bank()} questions indexed)")
+    except Exception as e:
+        print(f"Error building question bank: {str(e)}")
+
+
+def tree_questions(node: Optional[dict]):
+    if node:
+        yield node["question"]
+        for child in node.get("next", {}).values():
+            yield from tree_questions(child)
+
+
+def count_questions(node: Optional[dict]) -> int:
+    if not node:
+        return 0
+    return 1 + sum(count_questions(child) for child in node.get("next", {}).values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["model", "engine"], default="model",
+                        help="the chat model (LLM_PROVIDER, e.g. fake) or the local attribute engine")
+    parser.add_argument("--words", help="comma-separated word list (default: the game's WORD_LIST)")
+    parser.add_argument("--concurrency", type=int, default=8, help="model calls at once")
+    parser.add_argument("--output", default=bank_path)
+    args = parser.parse_args()
+
+    from langgraph_core.nodes.word_game import MAX_QUESTIONS, WORD_LIST
+
+    words = [word.strip() for word in args.words.split(",")] if args.words else WORD_LIST
+    start = time.perf_counter()
+    tree = asyncio.run(build_tree(words, MAX_QUESTIONS, args.source, args.concurrency))
+    save_bank(words, MAX_QUESTIONS, args.source, tree, args.output)
+    print(f"{count_questions(tree)} questions for {len(words)} words in {time.perf_counter() - start:.1f}s, "
+          f"saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
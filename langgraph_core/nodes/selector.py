@@ -24,6 +24,7 @@ def game_selector(state: GameState) -> GameState:
             messages.append("Returning to game selection. Please select a game.")
         else:
             messages.append("Thanks for playing! Goodbye!")
+        state["phase"] = "select_game"
     elif user_input == "1":
         state.update({
             "game_choice": "number_game",
@@ -56,6 +57,7 @@ def game_selector(state: GameState) -> GameState:
         return exit_game(state)
     else:
         state["game_choice"] = None
+        state["phase"] = "select_game"
         messages.append("Invalid choice. Please select a valid game option.")
 
     if messages:
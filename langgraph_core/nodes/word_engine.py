@@ -0,0 +1,138 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+engine_mode = os.getenv("WORD_GAME_ENGINE", "llm")
+attributes_path = os.getenv(
+    "WORD_ATTRIBUTES_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "word_attributes.json")
+)
+
+# Answer outcomes, in the order of the last axis of the likelihood table
+YES, NO, MAYBE = 0, 1, 2
+# Chance that the player answers against the recorded attribute value
+ANSWER_NOISE = 0.05
+
+
+def answer_outcome(answer: str) -> int:
+    answer = answer.strip().lower()
+    if answer in ["yes", "y"]:
+        return YES
+    if answer in ["no", "n"]:
+        return NO
+    return MAYBE
+
+
+def answer_likelihoods(matrix: np.ndarray) -> np.ndarray:
+    """
+    Turn attribute values (1 = yes, 0 = no, 0.5 = it depends) into
+    P(yes/no/maybe | word) for every word and attribute.
+    """
+    p_maybe = 0.1 + 0.3 * (1 - np.abs(2 * matrix - 1))
+    p_yes = (1 - p_maybe) * (ANSWER_NOISE + (1 - 2 * ANSWER_NOISE) * matrix)
+    p_no = 1 - p_maybe - p_yes
+    return np.stack([p_yes, p_no, p_maybe], axis=-1)
+
+
+def entropy(p: np.ndarray, axis: int = 0) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=axis)
+
+
+class WordEngine:
+    """
+    Local question engine for the word game: a word × attribute answer matrix,
+    a probability vector over the candidate words updated from the player's
+    answers, and questions chosen by maximum expected information gain.
+    """
+
+    def __init__(self, words: list[str], attributes: list[dict], matrix: np.ndarray):
+        self.word_index = {word: i for i, word in enumerate(words)}
+        self.questions = [attribute["question"] for attribute in attributes]
+        self.question_index = {question: j for j, question in enumerate(self.questions)}
+        self.likelihood = answer_likelihoods(np.asarray(matrix, dtype=float))
+
+    @classmethod
+    def from_file(cls, path: str) -> "WordEngine":
+        with open(path) as f:
+            data = json.load(f)
+        words = list(data["words"])
+        return cls(words, data["attributes"], np.array([data["words"][word] for word in words]))
+
+    def supports(self, words: list[str]) -> bool:
+        return all(word.lower() in self.word_index for word in words)
+
+    def _rows(self, words: list[str]) -> np.ndarray:
+        return np.array([self.word_index[word.lower()] for word in words])
+
+    def posterior(self, words: list[str], questions: list[str], answers: list[str]) -> np.ndarray:
+        """
+        Probability of each word (in `words` order) given the answered questions.
+        Questions that are not in the matrix (e.g. asked by the LLM) are ignored.
+        """
+        likelihood = self.likelihood[self._rows(words)]
+        p = np.full(len(words), 1 / len(words))
+        for question, answer in zip(questions, answers):
+            j = self.question_index.get(question)
+            if j is not None:
+                p = p * likelihood[:, j, answer_outcome(answer)]
+        return p / p.sum()
+
+    def best_question(self, words: list[str], posterior: np.ndarray, asked) -> Optional[str]:
+        """
+        The unasked question with the highest expected information gain, or
+        None if no remaining question tells the candidates apart.
+        """
+        likelihood = self.likelihood[self._rows(words)]
+        joint = posterior[:, None, None] * likelihood
+        p_answer = joint.sum(axis=0)
+        expected_entropy = (p_answer * entropy(joint / p_answer, axis=0)).sum(axis=1)
+        gain = entropy(posterior) - expected_entropy
+
+        for j in np.argsort(-gain):
+            if gain[j] <= 1e-9:
+                return None
+            if self.questions[j] not in asked:
+                return self.questions[j]
+        return None
+
+
+word_engine = WordEngine.from_file(attributes_path) if engine_mode == "local" else None
+_fallback_engine: Optional[WordEngine] = None
+
+
+def fallback_engine() -> WordEngine:
+    """
+    The local engine, loaded on first use when the game otherwise runs on the LLM.
+    """
+    global _fallback_engine
+    if word_engine is not None:
+        return word_engine
+    if _fallback_engine is None:
+        _fallback_engine = WordEngine.from_file(attributes_path)
+    return _fallback_engine
+
+
+def uses_local_engine(wg) -> bool:
+    return word_engine is not None and word_engine.supports(wg["words"])
+
+
+def word_posterior(wg) -> np.ndarray:
+    return word_engine.posterior(wg["words"], wg["questions"], wg["answers"])
+
+
+def local_question(wg) -> Optional[str]:
+    """
+    Pick the next question locally and record it as asked.
+    """
+    asked = wg.setdefault("asked_set", set())
+    question = word_engine.best_question(wg["words"], word_posterior(wg), asked)
+    if question is not None:
+        asked.add(question)
+    return question
+
+
+def local_guess(wg) -> str:
+    return wg["words"][int(np.argmax(word_posterior(wg)))]
@@ -1,9 +1,65 @@
+import asyncio
+import contextvars
+import os
+import re
+from difflib import SequenceMatcher
+from typing import Optional
+
+import numpy as np
+from langchain_core.runnables import RunnableConfig
+
+from langgraph_core.game_states.compact import register_word_list
 from langgraph_core.game_states.game_state import GameState
-from langgraph_core.prompts.wg_prompts import get_question_prompt, guess_word_prompt
+from langgraph_core.nodes.question_bank import bank_question, has_bank
+from langgraph_core.nodes.word_engine import (
+    fallback_engine,
+    uses_local_engine,
+    local_question,
+    local_guess,
+    word_posterior
+)
+from langgraph_core.prompts.wg_prompts import get_question_prompt, guess_word_prompt, word_turn_prompt, WordGameTurn
+from utils.circuit_breaker import CircuitOpenError
+from utils.gateway import GatewayOverloaded
+from utils.metrics import CallbackCounter, game_fallbacks, metrics_enabled, registry
 from utils.model import model
 
 WORD_LIST = ["apple", "kiwi", "desk", "chair", "car", "pen"]
 MAX_QUESTIONS = 5
+register_word_list(WORD_LIST)
+
+# "text": free-text question and guess calls; "structured": one structured call per turn
+# that returns the remaining candidates, the next question and an optional guess
+turn_mode = os.getenv("WORD_GAME_TURN_MODE", "text")
+
+# Guess as soon as the most likely word reaches this probability
+CONFIDENCE_THRESHOLD = float(os.getenv("WORD_GAME_CONFIDENCE_THRESHOLD", "0.9"))
+
+# Number of candidate questions requested per model call
+QUESTION_CANDIDATES = 3
+# Similarity above which a candidate counts as a repeat of an asked question
+DUPLICATE_SIMILARITY = 0.85
+# Similarity above which a model question is read as one of the local engine's table questions
+FALLBACK_MATCH_SIMILARITY = 0.8
+
+# How often the first candidate was already asked and a later one had to be used
+question_stats = {"generated": 0, "fallbacks": 0, "all_duplicates": 0}
+
+if metrics_enabled:
+    registry.register(CallbackCounter(
+        "word_game_question_picks_total", "Model questions picked from their candidates, by which candidate was used",
+        ("result",),
+        lambda: {
+            ("first",): question_stats["generated"] - question_stats["fallbacks"] - question_stats["all_duplicates"],
+            ("later",): question_stats["fallbacks"],
+            ("all_duplicates",): question_stats["all_duplicates"]
+        }
+    ))
+
+# The run name identifies the call site to the model wrappers (e.g. its cache policy)
+QUESTION_CALL = {"run_name": "get_question"}
+GUESS_CALL = {"run_name": "guess_word"}
+TURN_CALL = {"run_name": "plan_word_turn"}
 
 def init_word_game_state(show_list: bool = False) -> dict:
     return {
@@ -28,86 +84,524 @@ def choose_word(state: GameState) -> GameState:
     ]
 
     state["word_game_state"] = init_word_game_state(show_list=True)
+    state["phase"] = "word_ready"
     return state
 
-def get_question(wg):
-    formatted_prompt = get_question_prompt.format(
+def format_question_prompt(wg) -> str:
+    return get_question_prompt.format(
         words=", ".join(wg["words"]),
+        num_candidates=QUESTION_CANDIDATES,
         question_number=wg["current_question_index"] + 1,
         max_q=wg["max_number_of_questions"],
-        asked=", ".join(wg.get("asked_set", set())) if wg.get("asked_set") else "none"
+        # Sorted so the same game position always produces the same prompt
+        asked=", ".join(sorted(wg["asked_set"])) if wg.get("asked_set") else "none"
     )
 
-    try:
-        question = model.invoke(formatted_prompt).content.strip()
 
-        if "asked_set" not in wg:
-            wg["asked_set"] = set()
+def normalize_question(question: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", question.lower()).split())
+
+
+def is_duplicate_question(question: str, asked) -> bool:
+    normalized = normalize_question(question)
+    return any(
+        normalized == other or SequenceMatcher(None, normalized, other).ratio() >= DUPLICATE_SIMILARITY
+        for other in map(normalize_question, asked)
+    )
+
+
+def parse_question_candidates(text: str) -> list[str]:
+    """
+    Split a numbered (or bulleted) list of questions into its items.
+    """
+    candidates = []
+    for line in text.splitlines():
+        question = re.sub(r"^\s*(\d+[.):]|[-*•])\s*", "", line).strip()
+        if question:
+            candidates.append(question)
+    return candidates
+
+
+def question_preview(text: str) -> str:
+    """
+    The first question of a partially generated candidate list, shown while it streams.
+    """
+    first_line = text.lstrip().split("\n", 1)[0]
+    # Still inside the list number
+    if re.fullmatch(r"\d*", first_line.strip()):
+        return ""
+    return re.sub(r"^\s*(\d+[.):]|[-*•])\s*", "", first_line).strip()
+
+
+def pick_question(wg, text: str) -> str:
+    """
+    Pick the first candidate that was not asked yet and record it as asked.
+    """
+    candidates = parse_question_candidates(text) or [text.strip()]
+    asked = wg.setdefault("asked_set", set())
+    question_stats["generated"] += 1
+
+    for i, question in enumerate(candidates):
+        if not is_duplicate_question(question, asked):
+            if i > 0:
+                question_stats["fallbacks"] += 1
+            break
+    else:
+        question_stats["all_duplicates"] += 1
+        question = candidates[0]
 
-        max_attempts = 3
-        attempt = 0
-        while question in wg["asked_set"] and attempt < max_attempts:
-            question = model.invoke(formatted_prompt).content.strip()
-            attempt += 1
+    asked.add(question)
+    return question
 
-        wg["asked_set"].add(question)
+
+def table_question(engine, question: str) -> str:
+    """
+    The engine's table question closest to one asked by the model, or the question itself.
+    """
+    if question in engine.question_index:
         return question
+    normalized = normalize_question(question)
+    best, best_ratio = question, FALLBACK_MATCH_SIMILARITY
+    for candidate in engine.questions:
+        ratio = SequenceMatcher(None, normalized, normalize_question(candidate)).ratio()
+        if ratio >= best_ratio:
+            best, best_ratio = candidate, ratio
+    return best
+
+
+def fallback_posterior(engine, wg, words: list[str]):
+    questions = [table_question(engine, question) for question in wg["questions"]]
+    return engine.posterior(words, questions, wg["answers"])
+
+
+def fallback_question(wg) -> Optional[str]:
+    """
+    Question asked when the model is unavailable: the local engine's best
+    question for word lists it knows, otherwise (or once no question tells the
+    words apart) the next unasked question of its table.
+    """
+    engine = fallback_engine()
+    asked = wg.setdefault("asked_set", set())
+
+    question = None
+    if engine.supports(wg["words"]):
+        asked_in_table = asked | {table_question(engine, question) for question in asked}
+        question = engine.best_question(wg["words"], fallback_posterior(engine, wg, wg["words"]), asked_in_table)
+    if question is None:
+        question = next((q for q in engine.questions if not is_duplicate_question(q, asked)), None)
+
+    if question is not None:
+        asked.add(question)
+    return question
+
+
+def fallback_guess(wg) -> str:
+    """
+    Guess made when the model is unavailable: the most likely remaining
+    candidate given the answers so far.
+    """
+    engine = fallback_engine()
+    words = wg.get("candidates") or wg["words"]
+    if not engine.supports(words):
+        return words[0]
+    return words[int(np.argmax(fallback_posterior(engine, wg, words)))]
+
 
+def note_fallback(kind: str, error: Optional[Exception] = None):
+    # An open circuit is expected to fail fast, so only unexpected errors are logged
+    if error is not None and not isinstance(error, CircuitOpenError):
+        print(f"Error generating {kind}, using the local fallback: {str(error)}")
+    if metrics_enabled:
+        game_fallbacks.inc(kind)
+
+
+def get_question(wg):
+    # The local engine handles word lists it knows; the LLM covers the rest
+    if uses_local_engine(wg):
+        question = local_question(wg)
+        if question is not None:
+            return question
+
+    try:
+        response = model.invoke(format_question_prompt(wg), QUESTION_CALL)
+        return pick_question(wg, response.content)
+
+    except GatewayOverloaded:
+        raise
     except Exception as e:
-        return e
+        note_fallback("question", e)
+        return fallback_question(wg)
 
 
-def ask_questions(state: GameState) -> GameState:
+async def aget_question(wg, fallback: bool = True):
+    """
+    Async variant of get_question, awaiting the model instead of blocking a thread.
+    Without `fallback`, a failed model call returns None.
+    """
+    if uses_local_engine(wg):
+        question = local_question(wg)
+        if question is not None:
+            return question
+
+    try:
+        response = await model.ainvoke(format_question_prompt(wg), QUESTION_CALL)
+        return pick_question(wg, response.content)
+
+    except GatewayOverloaded:
+        raise
+    except Exception as e:
+        if not fallback:
+            return None
+        note_fallback("question", e)
+        return fallback_question(wg)
+
+
+# Speculatively generated next questions, keyed by session (graph thread) id.
+# Each entry holds the prompt it was generated for and the running task.
+_prefetched_questions: dict[str, tuple[str, asyncio.Task]] = {}
+
+
+async def prefetch_question(wg):
+    # A prefetch the model fails or the gateway turns away is simply not used
+    try:
+        return await aget_question(wg, fallback=False)
+    except GatewayOverloaded:
+        return None
+
+
+def start_question_prefetch(session_id: str, wg):
+    """
+    Start generating the next question in the background. The question prompt
+    does not depend on the player's answer, so it can run while they think.
+    """
+    cancel_question_prefetch(session_id)
+
+    next_wg = {
+        "words": wg["words"],
+        "max_number_of_questions": wg["max_number_of_questions"],
+        "current_question_index": wg["current_question_index"],
+        "asked_set": set(wg.get("asked_set", set()))
+    }
+    # Run outside the request's context so the prefetch's tokens don't reach its stream callbacks
+    task = asyncio.get_running_loop().create_task(prefetch_question(next_wg), context=contextvars.Context())
+    _prefetched_questions[session_id] = (format_question_prompt(next_wg), task)
+
+
+async def take_prefetched_question(session_id: str, wg) -> Optional[str]:
+    """
+    Return the prefetched question for this turn, or None if there is no usable one.
+    """
+    prompt, task = _prefetched_questions.pop(session_id, (None, None))
+    if task is None:
+        return None
+
+    # The game moved on in a way the prefetch did not anticipate
+    if prompt != format_question_prompt(wg):
+        task.cancel()
+        return None
+
+    question = await task
+    if not isinstance(question, str):
+        return None
+
+    wg.setdefault("asked_set", set()).add(question)
+    return question
+
+
+def cancel_question_prefetch(session_id: str):
+    _, task = _prefetched_questions.pop(session_id, (None, None))
+    if task is not None:
+        task.cancel()
+
+
+def record_answer(wg, user_input: str):
+    # Record the player's answer to the last question if one is pending
+    if user_input and len(wg["answers"]) < len(wg["questions"]):
+        wg["answers"].append(user_input)
+
+
+def uses_structured_turns(wg) -> bool:
+    return turn_mode == "structured" and not uses_local_engine(wg)
+
+
+def format_qa(wg) -> str:
+    return "\n".join(
+        f"Q{i + 1}: {q} A: {wg['answers'][i]}"
+        for i, q in enumerate(wg["questions"])
+        if i < len(wg["answers"])
+    )
+
+
+def format_turn_prompt(wg) -> str:
+    return word_turn_prompt.format(
+        words=", ".join(wg["words"]),
+        qa=format_qa(wg) or "none yet",
+        asked=", ".join(sorted(wg["asked_set"])) if wg.get("asked_set") else "none",
+        questions_left=wg["max_number_of_questions"] - wg["current_question_index"]
+    )
+
+
+def match_word(wg, text: Optional[str]) -> Optional[str]:
+    """
+    Map a word returned by the model (e.g. "Kiwi!") onto the game's word list.
+    """
+    normalized = re.sub(r"[^a-z]", "", (text or "").lower())
+    for word in wg["words"]:
+        if word.lower() == normalized:
+            return word
+    return None
+
+
+def apply_word_turn(wg, turn: WordGameTurn):
+    """
+    Validate a structured turn against the word list and store it on the game state.
+    """
+    candidates = list(dict.fromkeys(
+        word for word in map(lambda c: match_word(wg, c), turn.remaining_candidates) if word
+    )) or list(wg["words"])
+
+    guess = match_word(wg, turn.guess)
+    if guess is None and len(candidates) == 1:
+        guess = candidates[0]
+
+    question = (turn.next_question or "").strip() or None
+    if question and is_duplicate_question(question, wg.get("asked_set", set())):
+        question = None
+
+    wg["candidates"] = candidates
+    wg["planned_question"] = question
+    wg["planned_guess"] = guess
+    wg["confidence"] = 1.0 if guess else 1 / len(candidates)
+
+
+def plan_word_turn(wg):
+    try:
+        turn = model.with_structured_output(WordGameTurn).invoke(format_turn_prompt(wg), TURN_CALL)
+        apply_word_turn(wg, turn)
+    except GatewayOverloaded:
+        raise
+    except Exception as e:
+        if not isinstance(e, CircuitOpenError):
+            print(f"Error planning word game turn: {str(e)}")
+        wg["planned_question"] = None
+        wg["planned_guess"] = None
+
+
+async def aplan_word_turn(wg):
+    try:
+        turn = await model.with_structured_output(WordGameTurn).ainvoke(format_turn_prompt(wg), TURN_CALL)
+        apply_word_turn(wg, turn)
+    except GatewayOverloaded:
+        raise
+    except Exception as e:
+        if not isinstance(e, CircuitOpenError):
+            print(f"Error planning word game turn: {str(e)}")
+        wg["planned_question"] = None
+        wg["planned_guess"] = None
+
+
+def take_bank_question(wg) -> Optional[str]:
+    question = bank_question(wg)
+    # A banked question replaces the one planned by the last structured turn
+    if question is not None:
+        wg.pop("planned_question", None)
+    return question
+
+
+def take_planned_question(wg) -> Optional[str]:
+    question = wg.pop("planned_question", None)
+    if question is not None:
+        wg.setdefault("asked_set", set()).add(question)
+    return question
+
+
+def update_confidence(wg):
+    if uses_local_engine(wg):
+        wg["confidence"] = float(word_posterior(wg).max())
+
+
+def record_word_answer(state: GameState) -> GameState:
+    """
+    Record the player's answer and update the confidence in the leading word.
+    In structured mode this is also where the turn's single model call happens.
+    """
+    wg = state["word_game_state"]
+    record_answer(wg, state.get("__user_input__", "").strip().lower())
+    if uses_structured_turns(wg):
+        plan_word_turn(wg)
+    update_confidence(wg)
+    return state
+
+
+async def arecord_word_answer(state: GameState) -> GameState:
+    wg = state["word_game_state"]
+    record_answer(wg, state.get("__user_input__", "").strip().lower())
+    if uses_structured_turns(wg):
+        await aplan_word_turn(wg)
+    update_confidence(wg)
+    return state
+
+
+def ready_to_guess(wg) -> bool:
+    """
+    Guess once all questions are used up or the answers already pin down the word.
+    """
+    return (wg["current_question_index"] >= wg["max_number_of_questions"] or
+            wg.get("confidence", 0.0) >= CONFIDENCE_THRESHOLD)
+
+
+def start_question_turn(state: GameState):
     if "word_game_state" not in state:
         state["word_game_state"] = init_word_game_state()
 
+    wg = state["word_game_state"]
+    record_answer(wg, state.get("__user_input__", "").strip().lower())
+    return wg
+
+
+def finish_question_turn(state: GameState, question) -> GameState:
     wg = state["word_game_state"]
     messages = []
 
-    if wg["current_question_index"] < wg["max_number_of_questions"]:
-        question = get_question(wg)
+    if question is not None:
         wg["questions"].append(question)
         append_question_prompt(messages, question, wg["current_question_index"])
         wg["current_question_index"] += 1
 
     state["__messages__"] = messages
+    state["phase"] = "word_answer"
     return state
 
 
-def guess_word(state: GameState) -> GameState:
-    wg = state.get("word_game_state", {})
-    user_input = state.get("__user_input__", "").strip().lower()
+def ask_questions(state: GameState) -> GameState:
+    wg = start_question_turn(state)
 
-    # Record latest user answer if one is pending
-    if user_input and len(wg["answers"]) < len(wg["questions"]):
-        wg["answers"].append(user_input)
+    question = None
+    if wg["current_question_index"] < wg["max_number_of_questions"]:
+        if not uses_local_engine(wg):
+            question = take_bank_question(wg)
+        if question is None and uses_structured_turns(wg):
+            # The first question has no planning turn before it
+            if "planned_question" not in wg:
+                plan_word_turn(wg)
+            question = take_planned_question(wg)
+        if question is None:
+            question = get_question(wg)
 
-    try:
-        qa_pairs = [
-            f"Q{i + 1}: {q} A: {wg['answers'][i]}"
-            for i, q in enumerate(wg["questions"])
-            if i < len(wg["answers"])
-        ]
+    return finish_question_turn(state, question)
+
+
+async def aask_questions(state: GameState, config: Optional[RunnableConfig] = None) -> GameState:
+    wg = start_question_turn(state)
+    session_id = (config or {}).get("configurable", {}).get("thread_id")
+
+    question = None
+    if wg["current_question_index"] < wg["max_number_of_questions"]:
+        if not uses_local_engine(wg):
+            question = take_bank_question(wg)
+        if question is None and uses_structured_turns(wg):
+            if "planned_question" not in wg:
+                await aplan_word_turn(wg)
+            question = take_planned_question(wg)
+        elif question is None and session_id:
+            question = await take_prefetched_question(session_id, wg)
+        if question is None:
+            question = await aget_question(wg)
 
-        qa_text = "\n".join(qa_pairs)
+    state = finish_question_turn(state, question)
 
-        guess = model.invoke(guess_word_prompt.format(
-            words=", ".join(wg["words"]),
-            qa=qa_text
-        )).content.strip()
+    # Local engine, banked and structured questions depend on the answers, so there is nothing to prefetch
+    answer_dependent = uses_local_engine(wg) or has_bank(wg) or uses_structured_turns(wg)
+    if session_id and wg["current_question_index"] < wg["max_number_of_questions"] and not answer_dependent:
+        start_question_prefetch(session_id, wg)
 
-        wg["guess"] = guess
+    return state
+
+
+def format_guess_prompt(wg) -> str:
+    return guess_word_prompt.format(
+        words=", ".join(wg["words"]),
+        qa=format_qa(wg)
+    )
 
-    except Exception:
-        wg["guess"] = WORD_LIST[0]
+
+def planned_guess(wg) -> str:
+    # Structured turns always end on a validated word from the list
+    guess = wg.pop("planned_guess", None)
+    # None when the last planning call failed
+    if guess is None:
+        note_fallback("guess")
+        guess = fallback_guess(wg)
+    return guess
+
+
+def finish_guess(state: GameState, guess: str) -> GameState:
+    wg = state["word_game_state"]
+    wg["guess"] = guess
 
     state["word_game_count"] = state.get("word_game_count", 0) + 1
     state["__messages__"] = [
         f"My guess is: **{wg['guess']}**",
         "Was I correct? (yes/no)"
     ]
+    state["phase"] = "guess_feedback"
+
+    return state
+
+
+def guess_word(state: GameState) -> GameState:
+    wg = state.get("word_game_state", {})
+    record_answer(wg, state.get("__user_input__", "").strip().lower())
+
+    if uses_local_engine(wg):
+        return finish_guess(state, local_guess(wg))
+    if uses_structured_turns(wg):
+        return finish_guess(state, planned_guess(wg))
+
+    try:
+        guess = model.invoke(format_guess_prompt(wg), GUESS_CALL).content.strip()
+    except GatewayOverloaded:
+        raise
+    except Exception as e:
+        note_fallback("guess", e)
+        guess = fallback_guess(wg)
+
+    return finish_guess(state, guess)
+
+
+async def aguess_word(state: GameState) -> GameState:
+    wg = state.get("word_game_state", {})
+    record_answer(wg, state.get("__user_input__", "").strip().lower())
+
+    if uses_local_engine(wg):
+        return finish_guess(state, local_guess(wg))
+    if uses_structured_turns(wg):
+        return finish_guess(state, planned_guess(wg))
 
-    if user_input in ["yes", "no"]:
-        state["game_choice"] = "retry" if user_input == "yes" else None
+    try:
+        guess = (await model.ainvoke(format_guess_prompt(wg), GUESS_CALL)).content.strip()
+    except GatewayOverloaded:
+        raise
+    except Exception as e:
+        note_fallback("guess", e)
+        guess = fallback_guess(wg)
+
+    return finish_guess(state, guess)
+
+
+def check_guess(state: GameState) -> GameState:
+    user_input = state.get("__user_input__", "").strip().lower()
+
+    if user_input in ["yes", "y"]:
+        state["__messages__"] = [
+            "Yay! I guessed right!",
+            "Would you like to play again?"
+        ]
+    else:
+        state["__messages__"] = [
+            "I'm sorry I couldn't guess your word.",
+            "Would you like to play again?"
+        ]
 
+    state["phase"] = "play_again"
     return state
\ No newline at end of file
@@ -1,14 +1,20 @@
+from typing import Optional
+
 from langchain_core.prompts import PromptTemplate
+from pydantic import BaseModel, Field
 
-# Prompt for getting a question in the word game
+# Prompt for getting candidate questions in the word game (best first, one per line)
 get_question_prompt = PromptTemplate.from_template(
     """You are a word detective. The user has chosen a word from this list: {words}.
-Ask a unique, descriptive yes/no/maybe question (not a guess) to help narrow it down.
+Suggest {num_candidates} different, descriptive yes/no/maybe questions (not guesses) to help narrow it down.
 Avoid repeating previous questions: {asked}.
 This is question {question_number} of {max_q}.
-Do NOT guess the word — just ask a useful question.
-Do NOT return anything other than the question. 
-Here is an example response: Is it a living thing?"""
+Do NOT guess the word — just ask useful questions.
+Return ONLY a numbered list with one question per line, best question first.
+Here is an example response:
+1. Is it a living thing?
+2. Can you eat it?
+3. Would you find it in an office?"""
 )
 
 # Prompt for guessing the word in the word game
@@ -19,4 +25,33 @@ Based on these question-answer pairs:
 Which word do you think the user picked? Make SURE to ONLY return ONE word from the list.
 Do NOT include any other statements other than the guess word.
 Here is an example response: Kiwi!"""
-)
\ No newline at end of file
+)
+
+class WordGameTurn(BaseModel):
+    """
+    Structured reply for one word game turn: belief update, next question and optional guess.
+    """
+    remaining_candidates: list[str] = Field(
+        description="Words from the list that are still consistent with every answer so far"
+    )
+    next_question: Optional[str] = Field(
+        default=None,
+        description="The next yes/no/maybe question to ask, or null when guessing"
+    )
+    guess: Optional[str] = Field(
+        default=None,
+        description="A word from the list, only when confident or when no questions are left"
+    )
+
+
+# Prompt for the merged "update belief + next question" call in the word game
+word_turn_prompt = PromptTemplate.from_template(
+    """You are a word detective. The user has chosen a word from this list: {words}.
+Here are the question-answer pairs so far:
+{qa}
+Questions already asked: {asked}.
+Questions left: {questions_left}.
+1. List the words from the list that are still consistent with all the answers.
+2. Suggest the next unique, descriptive yes/no/maybe question (not a guess) that best narrows them down.
+3. If only one word remains, or no questions are left, give your guess: exactly ONE word from the list."""
+)
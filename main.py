@@ -1,10 +1,44 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from APIs.number_game.ng_api import router as number_game_router
 from APIs.word_game.wg_api import router as word_game_router
+from APIs.session.session_api import router as session_router
+from APIs.session.ws_api import router as ws_router
+from APIs.batch.batch_api import router as batch_router
+from langgraph_core.graph.checkpointer import async_checkpointer
 from langgraph_core.graph.graph import app as langgraph_app
+from langgraph_core.nodes.question_bank import warm_question_bank
+from langgraph_core.nodes.word_game import MAX_QUESTIONS, WORD_LIST
+from utils.compression import CompressionMiddleware, compression_enabled, compression_minimum_size
+from utils.fast_json import GameJSONResponse
+from utils.gateway import GatewayOverloaded
+from utils.metrics import metrics_enabled, registry
+from utils.tracing import exporter, span, tracing_enabled
+
+# Build the question bank for WORD_LIST at startup if it has none ("model" or "engine")
+warm_bank = os.getenv("QUESTION_BANK_WARMUP", "false").lower() == "true"
+bank_source = os.getenv("QUESTION_BANK_SOURCE", "model")
+
 
-app = FastAPI(title="LangGraph Game API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Requests drive the graph with ainvoke, which needs an async-capable checkpointer
+    async with async_checkpointer() as saver:
+        langgraph_app.checkpointer = saver
+        # Runs in the background; games use the model until the bank is ready
+        warmup = asyncio.create_task(warm_question_bank(WORD_LIST, MAX_QUESTIONS, bank_source)) if warm_bank else None
+        yield
+        if warmup is not None:
+            warmup.cancel()
+    exporter.flush()
+
+
+app = FastAPI(title="LangGraph Game API", lifespan=lifespan, default_response_class=GameJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,16 +48,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if compression_enabled:
+    app.add_middleware(CompressionMiddleware, minimum_size=compression_minimum_size)
+
+if tracing_enabled:
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        attributes = {
+            "http.method": request.method,
+            "http.target": request.url.path,
+            "http.request_content_length": int(request.headers.get("content-length", 0)),
+        }
+        with span(f"{request.method} {request.url.path}", kind="SERVER", attributes=attributes) as current:
+            response = await call_next(request)
+            if current is not None:
+                # Name the span after the route template rather than the concrete path (session ids)
+                route = request.scope.get("route")
+                if route is not None:
+                    current.name = f"{request.method} {route.path}"
+                current.set_attribute("http.status_code", response.status_code)
+                if "content-length" in response.headers:
+                    current.set_attribute("http.response_content_length", int(response.headers["content-length"]))
+            return response
+
+
+@app.exception_handler(GatewayOverloaded)
+async def gateway_overloaded(request: Request, exc: GatewayOverloaded):
+    # Fail fast rather than hold the request past the client's timeout
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": exc.retry_after_header}
+    )
+
+
 # Include routers from different game APIs
 app.include_router(number_game_router)
 app.include_router(word_game_router)
+app.include_router(session_router)
+app.include_router(ws_router)
+app.include_router(batch_router)
 
 
 @app.get("/")
-def welcome():
+async def welcome():
     return {"message": "Welcome to the LangGraph Game API!"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    if not metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (set METRICS_ENABLED=true)")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
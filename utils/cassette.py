@@ -0,0 +1,179 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+
+from utils.llm_cache import prompt_text
+
+
+class CassetteMissError(Exception):
+    """
+    Raised in replay mode for a prompt the cassette has no recording of.
+    """
+
+
+class Cassette:
+    """
+    Append-only JSON Lines file of model interactions: one line per call with
+    the prompt key, call site, response and how long the model took.
+
+    New recordings are served by `next` straight away but written in batches
+    through one open file, once `batch_size` lines are waiting or the oldest
+    has waited `flush_seconds`, and at exit.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, flush_seconds: float = 5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[str, list[dict]] = defaultdict(list)
+        self._cursors: dict[str, int] = defaultdict(int)
+        self._pending: list[str] = []
+        self._oldest = None
+        # Opened on the first write, so replaying never creates the file
+        self._file = None
+        atexit.register(self.flush)
+
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def append(self, entry: dict):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._entries[entry["key"]].append(entry)
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(line)
+            if len(self._pending) >= self.batch_size or time.monotonic() - self._oldest >= self.flush_seconds:
+                self._write_pending()
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.writelines(lines)
+            self._file.flush()
+        except OSError as e:
+            print(f"Error writing cassette: {str(e)}")
+
+    def next(self, key: str) -> Optional[dict]:
+        """
+        The recordings of a prompt in recorded order, starting over once all were served.
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            entry = entries[self._cursors[key] % len(entries)]
+            self._cursors[key] += 1
+            return entry
+
+
+class CassetteModel:
+    """
+    Wraps a chat model to record its responses to a Cassette, or to replay
+    them without calling the model.
+
+    In "replay" mode responses are served by prompt (and call site, taken from
+    the `run_name` in the call's config); `timing_scale` sleeps for that share
+    of the recorded latency (0 replays instantly, 1 at the original speed).
+    Everything other than invoke/ainvoke is delegated to the wrapped model.
+    """
+
+    def __init__(self, model, cassette: Cassette, mode: str = "record", timing_scale: float = 0.0,
+                 namespace: str = "", schema=None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.model = model
+        self.cassette = cassette
+        self.mode = mode
+        self.timing_scale = timing_scale
+        self.namespace = namespace
+        # Pydantic model of structured outputs, recorded as JSON
+        self.schema = schema
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        return CassetteModel(
+            self.model.with_structured_output(schema, **kwargs),
+            self.cassette,
+            self.mode,
+            self.timing_scale,
+            namespace=f"{self.namespace}:{schema.__name__}",
+            schema=schema
+        )
+
+    def _encode(self, response) -> str:
+        return response.model_dump_json() if self.schema is not None else response.content
+
+    def _decode(self, text: str):
+        return self.schema.model_validate_json(text) if self.schema is not None else AIMessage(content=text)
+
+    def _key(self, prompt, config: Optional[RunnableConfig]) -> tuple[str, Optional[str]]:
+        call_site = (config or {}).get("run_name")
+        key = hashlib.sha256(f"{self.namespace}\x00{call_site}\x00{prompt_text(prompt)}".encode()).hexdigest()
+        return key, call_site
+
+    def _replay(self, key: str) -> dict:
+        entry = self.cassette.next(key)
+        if entry is None:
+            raise CassetteMissError(f"No recorded response for prompt {key[:12]}")
+        return entry
+
+    def _record(self, key: str, call_site: Optional[str], response, started: float):
+        self.cassette.append({
+            "key": key,
+            "call_site": call_site,
+            "response": self._encode(response),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "recorded_at": time.time()
+        })
+
+    def invoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        key, call_site = self._key(prompt, config)
+        if self.mode == "replay":
+            entry = self._replay(key)
+            time.sleep(entry["latency_ms"] / 1000 * self.timing_scale)
+            return self._decode(entry["response"])
+
+        started = time.perf_counter()
+        response = self.model.invoke(prompt, config, **kwargs)
+        self._record(key, call_site, response, started)
+        return response
+
+    async def ainvoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        key, call_site = self._key(prompt, config)
+        if self.mode == "replay":
+            entry = self._replay(key)
+            await asyncio.sleep(entry["latency_ms"] / 1000 * self.timing_scale)
+            return self._decode(entry["response"])
+
+        started = time.perf_counter()
+        response = await self.model.ainvoke(prompt, config, **kwargs)
+        self._record(key, call_site, response, started)
+        return response
@@ -0,0 +1,124 @@
+import threading
+import time
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from utils.gateway import GatewayOverloaded
+from utils.metrics import circuit_opened, metrics_enabled, short_circuited
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling the model while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls (errors or
+    timeouts) and short-circuits calls for `cooldown_seconds`. After the
+    cool-down a single probe call goes through: success closes the circuit,
+    failure opens it for another cool-down.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return self.state == CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                if metrics_enabled:
+                    circuit_opened.inc()
+
+    def record_abandoned(self):
+        """
+        A call ended without telling whether the model works (cancelled or turned
+        away by the gateway), so another call may probe.
+        """
+        with self._lock:
+            self._probing = False
+
+
+class BreakerModel:
+    """
+    Wraps a chat model with a CircuitBreaker, raising CircuitOpenError at once
+    instead of calling a model that keeps failing.
+    Everything other than invoke/ainvoke is delegated to the wrapped model.
+    """
+
+    def __init__(self, model, breaker: CircuitBreaker):
+        self.model = model
+        self.breaker = breaker
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        return BreakerModel(self.model.with_structured_output(schema, **kwargs), self.breaker)
+
+    def _check(self, config: Optional[RunnableConfig]):
+        if not self.breaker.allow():
+            if metrics_enabled:
+                short_circuited.inc((config or {}).get("run_name") or "unknown")
+            raise CircuitOpenError("The model is unavailable, using the local fallback")
+
+    def invoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        self._check(config)
+        try:
+            response = self.model.invoke(prompt, config, **kwargs)
+        except GatewayOverloaded:
+            self.breaker.record_abandoned()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.record_abandoned()
+            raise
+        self.breaker.record_success()
+        return response
+
+    async def ainvoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        self._check(config)
+        try:
+            response = await self.model.ainvoke(prompt, config, **kwargs)
+        except GatewayOverloaded:
+            self.breaker.record_abandoned()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.record_abandoned()
+            raise
+        self.breaker.record_success()
+        return response
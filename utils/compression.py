@@ -0,0 +1,86 @@
+import os
+from typing import Optional
+
+from starlette.datastructures import Headers
+# Responders of Starlette's GZipMiddleware, added in 0.46 (pinned in requirements.txt)
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+compression_enabled = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+# Responses smaller than this are sent uncompressed
+compression_minimum_size = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500"))
+# Fast levels: game responses are small and latency matters more than the last few bytes
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+try:
+    # Optional dependency: brotli (br is only offered when it is installed)
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """
+    Encodings the client accepts, leaving out any it refuses with q=0.
+    """
+    encodings = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            refused = float(quality) == 0 if quality else False
+        except ValueError:
+            refused = False
+        if name.strip() and not refused:
+            encodings.add(name.strip())
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in encodings:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = BROTLI_QUALITY):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # Streamed chunks are flushed so each one reaches the client as it is sent
+        compressed = self.compressor.process(body)
+        return compressed + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least `minimum_size` bytes with brotli when the
+    client accepts it and brotli is installed, otherwise with gzip if accepted.
+    Server-sent event streams are left uncompressed, so tokens are not held
+    back in a compressor buffer.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=GZIP_LEVEL)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
@@ -0,0 +1,185 @@
+import asyncio
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+
+# Questions the fake model draws from, in the style of the real model's output
+CANNED_QUESTIONS = [
+    "Is it a living thing?",
+    "Can you eat it?",
+    "Would you find it in an office?",
+    "Is it bigger than a breadbox?",
+    "Is it made of metal?",
+    "Can you sit on it?",
+    "Is it usually found indoors?",
+    "Does it have wheels?",
+    "Is it used for writing?",
+    "Does it grow on a tree?",
+    "Is it green?",
+    "Can you hold it in one hand?",
+    "Is it a piece of furniture?",
+    "Does it need fuel or electricity?",
+    "Is it sweet?",
+    "Is it made of wood?",
+]
+
+
+class FakeModelError(Exception):
+    """
+    Error injected by FakeChatModel.
+    """
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for the chat model, for load tests and benchmarks.
+
+    Recognizes the word game prompts and answers them with canned questions,
+    guesses and structured turns after a log-normally distributed delay.
+    It can repeat already asked questions (`duplicate_rate`) and fail with
+    FakeModelError (`error_rate`). Streaming yields the reply word by word.
+    """
+    latency_ms: float = 300.0
+    latency_sigma: float = 0.5
+    duplicate_rate: float = 0.0
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+    questions: list[str] = CANNED_QUESTIONS
+
+    _rng: random.Random = PrivateAttr()
+
+    def model_post_init(self, __context: Any):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def sample_latency(self) -> float:
+        """
+        Simulated response time in seconds (log-normal around `latency_ms`).
+        """
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.latency_ms / 1000 * self._rng.lognormvariate(0, self.latency_sigma)
+
+    def _maybe_fail(self):
+        if self._rng.random() < self.error_rate:
+            raise FakeModelError("Injected fake model error")
+
+    def _pick_questions(self, text: str, count: int) -> list[str]:
+        asked = [question for question in self.questions if question in text]
+        fresh = [question for question in self.questions if question not in text] or self.questions
+        picked = self._rng.sample(fresh, min(count, len(fresh)))
+        if asked and self._rng.random() < self.duplicate_rate:
+            picked[0] = self._rng.choice(asked)
+        return picked
+
+    def _words(self, text: str) -> list[str]:
+        match = re.search(r"(?:from this list|possible words are): (.*?)\.\n", text)
+        return [word.strip() for word in match.group(1).split(",")] if match else ["apple"]
+
+    def reply(self, text: str) -> str:
+        """
+        Text reply to a rendered prompt.
+        """
+        count = re.search(r"Suggest (\d+) different", text)
+        if count:
+            questions = self._pick_questions(text, int(count.group(1)))
+            return "\n".join(f"{i}. {question}" for i, question in enumerate(questions, start=1))
+        if "Which word do you think" in text:
+            return f"{self._rng.choice(self._words(text)).title()}!"
+        if re.search(r"\byes, no,? or maybe\b", text):
+            return self._rng.choice(["yes", "no", "maybe"])
+        return self._rng.choice(self.questions)
+
+    def _message(self, messages: list[BaseMessage], schema=None) -> AIMessage:
+        prompt = get_buffer_string(messages)
+        content = self.reply(prompt) if schema is None else self.structured_reply(schema, prompt).model_dump_json()
+        # Rough token counts (about 4 characters per token), so usage can be reported
+        input_tokens, output_tokens = max(1, len(prompt) // 4), max(1, len(content) // 4)
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        })
+
+    def structured_reply(self, schema, text: str):
+        """
+        Structured reply (e.g. a WordGameTurn) to a rendered prompt.
+        """
+        words = self._words(text)
+        questions_left = re.search(r"Questions left: (\d+)", text)
+        remaining = self._rng.sample(words, self._rng.randint(1, len(words)))
+        guess = None
+        if len(remaining) == 1 or (questions_left and int(questions_left.group(1)) == 0):
+            guess = remaining[0]
+        return schema.model_validate({
+            "remaining_candidates": remaining,
+            "next_question": None if guess else self._pick_questions(text, 1)[0],
+            "guess": guess
+        })
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        time.sleep(self.sample_latency())
+        self._maybe_fail()
+        message = self._message(messages, kwargs.get("structured_schema"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.sample_latency())
+        self._maybe_fail()
+        message = self._message(messages, kwargs.get("structured_schema"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        for chunk, delay in self._chunks(messages):
+            time.sleep(delay)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        for chunk, delay in self._chunks(messages):
+            await asyncio.sleep(delay)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _chunks(self, messages: list[BaseMessage]) -> list[tuple[ChatGenerationChunk, float]]:
+        # A third of the latency goes to the first token, the rest is spread over the others
+        latency = self.sample_latency()
+        self._maybe_fail()
+        message = self._message(messages)
+        tokens = re.findall(r"\S+\s*", message.content)
+        delays = [latency / 3] + [2 * latency / 3 / max(len(tokens) - 1, 1)] * (len(tokens) - 1)
+        chunks = [
+            # Usage is reported once, on the last chunk
+            ChatGenerationChunk(message=AIMessageChunk(
+                content=token, usage_metadata=message.usage_metadata if i == len(tokens) - 1 else None
+            ))
+            for i, token in enumerate(tokens)
+        ]
+        return list(zip(chunks, delays))
+
+    def with_structured_output(self, schema, **kwargs):
+        # The reply is generated as JSON by _generate/_agenerate, so callbacks (usage counters, tracing)
+        # see structured calls too. It is not streamed: a real structured reply has no text content.
+        parse = RunnableLambda(
+            lambda message: schema.model_validate_json(message.content), name=f"{schema.__name__}FakeStructuredOutput"
+        )
+        return self.bind(structured_schema=schema, stream=False) | parse
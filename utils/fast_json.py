@@ -0,0 +1,72 @@
+import functools
+import inspect
+from typing import Any, Callable
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def _default(obj):
+    # asked_set, when the compact state encoding is turned off
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+loads = orjson.loads
+
+
+class GameJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class GameRequest(Request):
+    """
+    Request whose JSON body is parsed with orjson.
+    """
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = loads(await self.body())
+        return self._json
+
+
+class GameRoute(APIRoute):
+    """
+    Route class for the game routers: request bodies are parsed with orjson,
+    and the dicts returned by async endpoints are rendered straight to a
+    GameJSONResponse instead of going through FastAPI's jsonable_encoder
+    (game states only hold JSON types, so it has nothing to convert).
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = self._respond_with_json(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _respond_with_json(endpoint: Callable) -> Callable:
+        @functools.wraps(endpoint)
+        async def respond(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            return result if isinstance(result, Response) else GameJSONResponse(result)
+        return respond
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def handle(request: Request) -> Response:
+            return await handler(GameRequest(request.scope, request.receive))
+        return handle
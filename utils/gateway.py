@@ -0,0 +1,256 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig, ensure_config
+
+from utils.llm_cache import prompt_text
+from utils.metrics import gateway_rejected, gateway_wait, metrics_enabled
+
+# Completion tokens reserved per call until the model reports its real usage
+EXPECTED_OUTPUT_TOKENS = 100
+
+
+class GatewayOverloaded(Exception):
+    """
+    Raised instead of queueing a model call that would not be admitted before
+    the gateway's deadline. The API answers it with a 429 and `Retry-After`.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"The model is busy, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute` / 60 per second, holding at most one minute's worth.
+    The level goes negative when calls use more than they reserved.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+
+class _Waiter:
+    __slots__ = ("lane", "tokens", "future")
+
+    def __init__(self, lane: str, tokens: int, future: asyncio.Future):
+        self.lane = lane
+        self.tokens = tokens
+        self.future = future
+
+
+class ModelGateway:
+    """
+    Admission control shared by every model call of the process.
+
+    At most `max_concurrency` calls run at once, and calls are admitted no
+    faster than the request and token buckets allow (a limit of 0 turns a
+    bucket off). Waiting calls queue in one lane per session and lanes are
+    served round-robin, so a session firing several calls cannot starve the
+    others. A call that would not be admitted within `queue_deadline` seconds
+    is rejected up front with GatewayOverloaded, as is one that is still
+    queued when its deadline passes.
+    """
+
+    def __init__(self, max_concurrency: int = 16, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 queue_deadline: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.queue_deadline = queue_deadline
+        self.active = 0
+        self.queued = 0
+        self._lanes: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_loop = None
+        # Moving average of call durations, for estimating queue waits
+        self._latency = 1.0
+
+    def _rate_wait(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.wait_time(1)
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def estimated_wait(self, tokens: int) -> float:
+        """
+        Rough time a call queued now would wait before it is admitted.
+        """
+        ahead = self.queued + 1
+        over = self.active + ahead - self.max_concurrency
+        wait = over / self.max_concurrency * self._latency if over > 0 else 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(ahead))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens * ahead))
+        return wait
+
+    def _admit(self, tokens: int):
+        self.active += 1
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+
+    def _remove(self, waiter: _Waiter):
+        waiters = self._lanes.get(waiter.lane)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self.queued -= 1
+        if not waiters:
+            del self._lanes[waiter.lane]
+
+    def _dispatch(self):
+        while self._lanes and self.active < self.max_concurrency:
+            lane, waiters = next(iter(self._lanes.items()))
+            waiter = waiters[0]
+            if waiter.future.done():
+                # Timed out or cancelled, about to withdraw itself
+                self._remove(waiter)
+                continue
+
+            wait = self._rate_wait(waiter.tokens)
+            if wait > 0:
+                self._schedule(wait)
+                return
+
+            waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._lanes.move_to_end(lane)
+            else:
+                del self._lanes[lane]
+            self._admit(waiter.tokens)
+            waiter.future.set_result(None)
+
+    def _schedule(self, delay: float):
+        loop = asyncio.get_running_loop()
+        # A wake-up left behind by an earlier event loop never fires
+        if self._wakeup is not None and self._wakeup_loop is loop:
+            return
+        self._wakeup = loop.call_later(delay, self._wake)
+        self._wakeup_loop = loop
+
+    def _wake(self):
+        self._wakeup = None
+        self._dispatch()
+
+    async def acquire(self, lane: str, tokens: int):
+        """
+        Wait for a slot for a call reserving `tokens` tokens. Every successful
+        acquire must be paired with a release.
+        """
+        if self.tokens is not None:
+            tokens = min(tokens, self.tokens.capacity)
+
+        if not self._lanes and self.active < self.max_concurrency and self._rate_wait(tokens) == 0:
+            self._admit(tokens)
+            return
+
+        wait = self.estimated_wait(tokens)
+        if wait > self.queue_deadline:
+            raise GatewayOverloaded(wait)
+
+        waiter = _Waiter(lane, tokens, asyncio.get_running_loop().create_future())
+        self._lanes.setdefault(lane, deque()).append(waiter)
+        self.queued += 1
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_deadline)
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            raise GatewayOverloaded(self.estimated_wait(tokens)) from None
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the caller went away
+                self.release()
+            else:
+                self._remove(waiter)
+            raise
+
+    def release(self, duration: Optional[float] = None):
+        self.active -= 1
+        if duration is not None:
+            self._latency += 0.2 * (duration - self._latency)
+        self._dispatch()
+
+    def settle(self, reserved: int, used: int):
+        """
+        Correct the token bucket once the model has reported the tokens a call used.
+        """
+        if self.tokens is not None:
+            self.tokens.take(used - reserved)
+
+
+class GatedModel:
+    """
+    Wraps a chat model so async calls go through a ModelGateway, queued in the
+    lane of their session (the graph thread id in the call's config, inherited
+    from the running graph node). Calls outside a session get a lane of their own.
+    Sync calls are not gated; everything other than ainvoke is delegated to the wrapped model.
+    """
+
+    def __init__(self, model, gateway: ModelGateway):
+        self.model = model
+        self.gateway = gateway
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        return GatedModel(self.model.with_structured_output(schema, **kwargs), self.gateway)
+
+    async def ainvoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        merged = ensure_config(config)
+        lane = merged["configurable"].get("thread_id") or f"task-{id(asyncio.current_task())}"
+        call_site = merged.get("run_name") or "unknown"
+        reserved = len(prompt_text(prompt)) // 4 + EXPECTED_OUTPUT_TOKENS
+
+        queued_at = time.perf_counter()
+        try:
+            await self.gateway.acquire(lane, reserved)
+        except GatewayOverloaded:
+            if metrics_enabled:
+                gateway_rejected.inc(call_site)
+            raise
+        started = time.perf_counter()
+        if metrics_enabled:
+            gateway_wait.observe(started - queued_at, call_site)
+
+        try:
+            response = await self.model.ainvoke(prompt, config, **kwargs)
+        finally:
+            self.gateway.release(time.perf_counter() - started)
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            self.gateway.settle(reserved, usage.get("total_tokens", reserved))
+        return response
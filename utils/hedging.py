@@ -0,0 +1,198 @@
+import asyncio
+import contextvars
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig, ensure_config
+
+from utils.metrics import hedge_saved, hedges, llm_retries, llm_timeouts, metrics_enabled
+
+# Latencies kept per call site for the hedging threshold
+LATENCY_WINDOW = 200
+# Calls observed at a call site before it starts hedging
+MIN_SAMPLES = 20
+
+# Threads that run sync calls with a deadline; a call past its deadline finishes here unobserved
+_sync_calls = ThreadPoolExecutor(thread_name_prefix="model-call")
+
+
+class ModelTimeout(Exception):
+    """
+    Raised when a model call (with its hedge, if any) misses its deadline.
+    """
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """
+    Deadline and hedging for one call site.
+
+    timeout is the whole call's deadline in seconds (None for no deadline).
+    With hedge=True a second identical request is sent once the call has run
+    longer than the observed `quantile` of the call site's latencies, and
+    whichever answers first is used.
+    """
+    timeout: Optional[float] = None
+    hedge: bool = False
+
+
+class LatencyWindow:
+    """
+    The most recent latencies of one call site's primary requests. A primary
+    cut short by a winning hedge or by the deadline counts with the time it
+    had run; hedges' own latencies are left out.
+    """
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def expected_remaining(self, elapsed: float) -> Optional[float]:
+        """
+        Mean remaining time of the observed calls that ran longer than `elapsed`.
+        """
+        longer = [sample - elapsed for sample in self.samples if sample > elapsed]
+        return sum(longer) / len(longer) if longer else None
+
+
+class HedgedModel:
+    """
+    Wraps a chat model to give calls a deadline and to hedge slow async ones.
+
+    Call sites are identified by the `run_name` in the call's config and
+    select a CallPolicy (`default` for the rest). A hedge is only sent when
+    the gateway has a free slot, so hedging never queues behind other calls.
+    The hedge runs without the call's callbacks, so its tokens are not
+    streamed twice. The slower request is cancelled.
+    Sync calls get the same deadline but are not hedged. They run on a worker
+    thread, which cannot be cancelled, so a call that misses its deadline
+    finishes in the background and its result is dropped. Everything other
+    than invoke and ainvoke is delegated to the wrapped model.
+    """
+
+    def __init__(self, model, policies: dict[str, CallPolicy], default: CallPolicy = CallPolicy(),
+                 quantile: float = 0.95, gateway=None, latencies=None):
+        self.model = model
+        self.policies = policies
+        self.default = default
+        self.quantile = quantile
+        self.gateway = gateway
+        self.latencies = latencies if latencies is not None else defaultdict(LatencyWindow)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        return HedgedModel(
+            self.model.with_structured_output(schema, **kwargs),
+            self.policies,
+            self.default,
+            self.quantile,
+            self.gateway,
+            self.latencies
+        )
+
+    def invoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        call_site = (config or {}).get("run_name") or "unknown"
+        policy = self.policies.get(call_site, self.default)
+        if not policy.timeout:
+            return self.model.invoke(prompt, config, **kwargs)
+
+        window = self.latencies[call_site]
+        started = time.perf_counter()
+        # The worker runs in this context, so callbacks and trace spans still see the caller's
+        call = _sync_calls.submit(contextvars.copy_context().run, self.model.invoke, prompt, config, **kwargs)
+        try:
+            response = call.result(timeout=policy.timeout)
+        except FutureTimeout:
+            call.cancel()
+            window.add(time.perf_counter() - started)
+            if metrics_enabled:
+                llm_timeouts.inc(call_site)
+            raise ModelTimeout(f"{call_site} got no response within {policy.timeout}s")
+
+        window.add(time.perf_counter() - started)
+        return response
+
+    def _can_hedge(self) -> bool:
+        gateway = self.gateway
+        return gateway is None or (not gateway.queued and gateway.active < gateway.max_concurrency)
+
+    async def ainvoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        call_site = (config or {}).get("run_name") or "unknown"
+        policy = self.policies.get(call_site, self.default)
+        window = self.latencies[call_site]
+        hedge_after = window.quantile(self.quantile) if policy.hedge else None
+
+        started = time.perf_counter()
+        deadline = started + policy.timeout if policy.timeout else None
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.perf_counter())
+
+        primary = asyncio.ensure_future(self.model.ainvoke(prompt, config, **kwargs))
+        attempts = {primary: started}
+        try:
+            if hedge_after is not None and (deadline is None or started + hedge_after < deadline):
+                await asyncio.wait([primary], timeout=hedge_after)
+                if not primary.done() and self._can_hedge():
+                    quiet = {**ensure_config(config), "callbacks": []}
+                    attempts[asyncio.ensure_future(self.model.ainvoke(prompt, quiet, **kwargs))] = time.perf_counter()
+                    if metrics_enabled:
+                        llm_retries.inc(call_site)
+
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The primary took at least this long; leaving it out would hide the tail
+                    window.add(time.perf_counter() - started)
+                    if metrics_enabled:
+                        llm_timeouts.inc(call_site)
+                    raise ModelTimeout(f"{call_site} got no response within {policy.timeout}s")
+
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+
+                    finished = time.perf_counter()
+                    if len(attempts) > 1:
+                        self._record_hedge(call_site, window, won=task is not primary, elapsed=finished - started)
+                    # The window estimates the primary's latency: when the hedge wins, the primary
+                    # had already run this long (a lower bound), and the hedge's own time is left out
+                    window.add(finished - started)
+                    return task.result()
+
+            raise error
+
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Retrieve errors of attempts that lost the race, so they are not logged as unhandled
+                    task.exception()
+
+    @staticmethod
+    def _record_hedge(call_site: str, window: LatencyWindow, won: bool, elapsed: float):
+        if not metrics_enabled:
+            return
+        hedges.inc(call_site, "hedge" if won else "primary")
+        if won:
+            # The primary was cancelled, so what it would have taken is estimated from the window
+            saved = window.expected_remaining(elapsed)
+            if saved is not None:
+                hedge_saved.observe(saved, call_site)
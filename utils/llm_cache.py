@@ -0,0 +1,225 @@
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from langchain_core.messages import AIMessage, get_buffer_string
+from langchain_core.runnables import RunnableConfig
+
+# response_metadata flag of a response handed to a caller that joined another caller's model call
+JOINED = "single_flight_joined"
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    How responses for one call site are cached.
+
+    pool_size=1 caches a single deterministic response per prompt. A larger pool
+    keeps calling the model until it holds that many responses for the prompt,
+    then samples from them, so sampled outputs (e.g. questions) keep some variety.
+    """
+    pool_size: int = 1
+
+
+class MemoryCache:
+    """
+    In-memory LRU cache of response lists with a size bound and TTL.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return []
+
+            expires_at, responses = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return []
+
+            self._entries.move_to_end(key)
+            return list(responses)
+
+    def add(self, key: str, response: str, pool_size: int = 1):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                entry = (time.monotonic() + self.ttl_seconds, [])
+                self._entries[key] = entry
+
+            # Misses racing for the same prompt may all finish; the pool keeps the first pool_size
+            if len(entry[1]) < pool_size:
+                entry[1].append(response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def fill(self, key: str, responses: list[str]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(responses))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache:
+    """
+    On-disk cache tier shared across processes and restarts.
+    Expired rows are deleted at most once every `purge_interval` seconds, on add.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 86400, purge_interval: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT NOT NULL, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_key ON llm_cache (key)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at)")
+
+    def get(self, key: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ? ORDER BY rowid",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def add(self, key: str, response: str, pool_size: int = 1):
+        now = time.time()
+        with self._lock, self._conn:
+            if now - self._purged_at >= self.purge_interval:
+                self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._purged_at = now
+
+            self._conn.execute(
+                "INSERT INTO llm_cache (key, response, created_at) "
+                "SELECT ?, ?, ? WHERE (SELECT COUNT(*) FROM llm_cache WHERE key = ? AND created_at >= ?) < ?",
+                (key, response, now, key, now - self.ttl_seconds, pool_size)
+            )
+
+
+class LLMCache:
+    """
+    Memory cache with an optional SQLite tier behind it.
+    """
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> list[str]:
+        responses = self.memory.get(key)
+        if not responses and self.disk is not None:
+            responses = self.disk.get(key)
+            if responses:
+                self.memory.fill(key, responses)
+        return responses
+
+    def add(self, key: str, response: str, pool_size: int = 1):
+        self.memory.add(key, response, pool_size)
+        if self.disk is not None:
+            self.disk.add(key, response, pool_size)
+
+
+def prompt_text(prompt) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    if hasattr(prompt, "to_messages"):
+        return get_buffer_string(prompt.to_messages())
+    if isinstance(prompt, list):
+        return get_buffer_string(prompt)
+    return str(prompt)
+
+
+class CachedModel:
+    """
+    Wraps a chat model and serves repeated prompts from an LLMCache.
+
+    The call site is identified by the `run_name` in the call's config and
+    selects a CachePolicy; calls without a policy go straight to the model.
+    Everything other than invoke/ainvoke is delegated to the wrapped model.
+    """
+
+    def __init__(self, model, cache: LLMCache, policies: dict[str, CachePolicy], namespace: str = "",
+                 schema=None, stats=None):
+        self.model = model
+        self.cache = cache
+        self.policies = policies
+        self.namespace = namespace
+        # Pydantic model of structured outputs, cached as JSON
+        self.schema = schema
+        self.stats = stats if stats is not None else defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        return CachedModel(
+            self.model.with_structured_output(schema, **kwargs),
+            self.cache,
+            self.policies,
+            namespace=f"{self.namespace}:{schema.__name__}",
+            schema=schema,
+            stats=self.stats
+        )
+
+    def _encode(self, response) -> str:
+        return response.model_dump_json() if self.schema is not None else response.content
+
+    def _decode(self, text: str):
+        return self.schema.model_validate_json(text) if self.schema is not None else AIMessage(content=text)
+
+    def _lookup(self, prompt, config: Optional[RunnableConfig]):
+        call_site = (config or {}).get("run_name")
+        policy = self.policies.get(call_site)
+        if policy is None:
+            return None, None
+
+        key = hashlib.sha256(f"{self.namespace}\x00{call_site}\x00{prompt_text(prompt)}".encode()).hexdigest()
+        responses = self.cache.get(key)
+        if len(responses) >= policy.pool_size:
+            self.stats[call_site]["hits"] += 1
+            return key, self._decode(random.choice(responses))
+
+        self.stats[call_site]["misses"] += 1
+        return key, None
+
+    def _store(self, key: Optional[str], response, config: Optional[RunnableConfig]):
+        # A response shared with a caller that joined another's call is stored by that other caller
+        if key is None or getattr(response, "response_metadata", {}).get(JOINED):
+            return
+        self.cache.add(key, self._encode(response), self.policies[config["run_name"]].pool_size)
+
+    def invoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        key, cached = self._lookup(prompt, config)
+        if cached is not None:
+            return cached
+
+        response = self.model.invoke(prompt, config, **kwargs)
+        self._store(key, response, config)
+        return response
+
+    async def ainvoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        key, cached = self._lookup(prompt, config)
+        if cached is not None:
+            return cached
+
+        response = await self.model.ainvoke(prompt, config, **kwargs)
+        self._store(key, response, config)
+        return response
@@ -0,0 +1,269 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.errors import GraphBubbleUp
+
+# Off by default: nothing is wrapped or recorded unless metrics are enabled
+metrics_enabled = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+
+# Histogram buckets in seconds, from fast graph nodes to slow model calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic counter with labels.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    """
+    Cumulative histogram with labels, in the Prometheus bucket layout.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket (+Inf last), sum]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: ([*counts], total) for key, (counts, total) in self._values.items()}
+        for label_values, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{format_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, label_values)} {total}"
+            yield f"{self.name}_count{format_labels(self.labels, label_values)} {cumulative}"
+
+
+class CallbackCounter:
+    """
+    Counter whose values are read from elsewhere (e.g. existing stats dicts) at scrape time.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple, read: Callable[[], dict]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.read = read
+
+    def samples(self):
+        for label_values, value in sorted(self.read().items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+
+class CallbackGauge(CallbackCounter):
+    """
+    Gauge whose values are read from elsewhere at scrape time.
+    """
+    kind = "gauge"
+
+
+class Registry:
+    """
+    Metrics exposed on /metrics, rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+node_duration = registry.register(Histogram(
+    "game_node_duration_seconds", "Time spent in each graph node", ("node",)
+))
+node_errors = registry.register(Counter(
+    "game_node_errors_total", "Exceptions raised by graph nodes", ("node", "error")
+))
+llm_duration = registry.register(Histogram(
+    "llm_request_duration_seconds", "Chat model call duration (cache hits excluded)", ("call_site",)
+))
+llm_errors = registry.register(Counter(
+    "llm_errors_total", "Failed chat model calls", ("call_site", "error")
+))
+llm_tokens = registry.register(Counter(
+    "llm_tokens_total", "Tokens reported by the chat model", ("call_site", "kind")
+))
+llm_retries = registry.register(Counter(
+    "llm_retries_total", "Chat model calls that were retried or re-issued", ("call_site",)
+))
+llm_timeouts = registry.register(Counter(
+    "llm_timeouts_total", "Chat model calls that missed their deadline", ("call_site",)
+))
+hedges = registry.register(Counter(
+    "llm_hedges_total", "Hedged chat model calls, by which request answered first", ("call_site", "winner")
+))
+hedge_saved = registry.register(Histogram(
+    "llm_hedge_saved_seconds", "Estimated time saved when the hedge answered first", ("call_site",)
+))
+circuit_opened = registry.register(Counter(
+    "llm_circuit_opened_total", "Times the model circuit breaker opened"
+))
+short_circuited = registry.register(Counter(
+    "llm_short_circuited_total", "Chat model calls skipped while the circuit breaker was open", ("call_site",)
+))
+game_fallbacks = registry.register(Counter(
+    "game_fallbacks_total", "Word game questions and guesses served by the local fallback", ("kind",)
+))
+gateway_wait = registry.register(Histogram(
+    "llm_gateway_wait_seconds", "Time chat model calls waited in the gateway queue", ("call_site",)
+))
+gateway_rejected = registry.register(Counter(
+    "llm_gateway_rejected_total", "Chat model calls turned away by the gateway", ("call_site",)
+))
+llm_coalesced = registry.register(Counter(
+    "llm_coalesced_total", "Chat model calls that joined an identical call already in flight", ("call_site",)
+))
+
+
+class MeteredModel:
+    """
+    Wraps a chat model and records call durations, token usage and errors per
+    call site (the `run_name` in the call's config).
+    Everything other than invoke/ainvoke is delegated to the wrapped model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        return MeteredModel(self.model.with_structured_output(schema, **kwargs))
+
+    def _record(self, config: Optional[RunnableConfig], started: float, response=None, error=None):
+        call_site = (config or {}).get("run_name") or "unknown"
+        if error is not None:
+            llm_errors.inc(call_site, type(error).__name__)
+            return
+
+        llm_duration.observe(time.perf_counter() - started, call_site)
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            llm_tokens.inc(call_site, "input", amount=usage.get("input_tokens", 0))
+            llm_tokens.inc(call_site, "output", amount=usage.get("output_tokens", 0))
+
+    def invoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.model.invoke(prompt, config, **kwargs)
+        except Exception as e:
+            self._record(config, started, error=e)
+            raise
+        self._record(config, started, response)
+        return response
+
+    async def ainvoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.model.ainvoke(prompt, config, **kwargs)
+        except Exception as e:
+            self._record(config, started, error=e)
+            raise
+        self._record(config, started, response)
+        return response
+
+
+def timed_node(name: str, func: Callable) -> Callable:
+    """
+    Wrap a graph node function to record its duration and errors.
+    Interrupts (the graph pausing for player input) are not errors.
+    The wrapper keeps the node's signature, so it still receives the config if it asks for it.
+    """
+    def record(started: float, error: Optional[Exception] = None):
+        if error is None:
+            node_duration.observe(time.perf_counter() - started, name)
+        elif not isinstance(error, GraphBubbleUp):
+            node_errors.inc(name, type(error).__name__)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                record(started, e)
+                raise
+            record(started)
+            return result
+    else:
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                record(started, e)
+                raise
+            record(started)
+            return result
+
+    return timed
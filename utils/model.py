@@ -1,16 +1,150 @@
 import os
 from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 
+from utils.cassette import Cassette, CassetteModel
+from utils.circuit_breaker import CLOSED, BreakerModel, CircuitBreaker
+from utils.gateway import GatedModel, ModelGateway
+from utils.hedging import CallPolicy, HedgedModel
+from utils.llm_cache import CachePolicy, CachedModel, LLMCache, MemoryCache, SQLiteCache
+from utils.metrics import CallbackCounter, CallbackGauge, MeteredModel, metrics_enabled, registry
+from utils.single_flight import SingleFlightModel
+from utils.tracing import TracedModel, tracing_enabled
+
 load_dotenv()
 
+# "openai", or "fake" for the offline FakeChatModel used by load tests and benchmarks
+provider = os.getenv("LLM_PROVIDER", "openai")
 api_key = os.getenv("OPENAI_API_KEY")
 model_name = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
 temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
 
-model = ChatOpenAI(
-    temperature=temperature,
-    model_name=model_name,
-    api_key=api_key
-)
+cache_enabled = os.getenv("LLM_CACHE", "true").lower() == "true"
+cache_max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+cache_ttl = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+cache_db_path = os.getenv("LLM_CACHE_DB_PATH")  # optional on-disk tier
+
+# Record model responses to (or replay them from) an append-only JSON Lines file
+cassette_path = os.getenv("LLM_CASSETTE")
+cassette_mode = os.getenv("LLM_CASSETTE_MODE", "record")  # or replay
+cassette_timing = float(os.getenv("LLM_CASSETTE_TIMING", "0"))  # share of the recorded latency to replay
+
+# Shared gateway in front of the model: concurrency, rate limits (0 = off) and queue deadline
+gateway_enabled = os.getenv("LLM_GATEWAY", "true").lower() == "true"
+max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+tokens_per_minute = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+queue_deadline = float(os.getenv("LLM_QUEUE_DEADLINE_SECONDS", "5"))
+
+# Deadline per model call, and hedging: a second request once a call runs past the observed p95
+call_timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "8"))
+hedging_enabled = os.getenv("LLM_HEDGING", "true").lower() == "true"
+hedge_quantile = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+
+# Stop calling a failing model for a cool-down after this many consecutive failures
+breaker_enabled = os.getenv("LLM_BREAKER", "true").lower() == "true"
+breaker_failures = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+breaker_cooldown = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Concurrent calls of these call sites with the same prompt share one model call
+single_flight_enabled = os.getenv("LLM_SINGLE_FLIGHT", "true").lower() == "true"
+single_flight_call_sites = {"get_question"}
+
+# Cache policies per call site (the run_name passed in the call's config)
+cache_policies = {
+    # Same transcript, same guess (or structured turn)
+    "guess_word": CachePolicy(),
+    "plan_word_turn": CachePolicy(),
+    # Keep a small pool of questions per game position and sample from it
+    "get_question": CachePolicy(pool_size=5),
+}
+
+# Deadline and hedging per call site; the game's own calls are hedged, others only get the deadline
+call_policies = {
+    "get_question": CallPolicy(timeout=call_timeout, hedge=hedging_enabled),
+    "guess_word": CallPolicy(timeout=call_timeout, hedge=hedging_enabled),
+    "plan_word_turn": CallPolicy(timeout=call_timeout, hedge=hedging_enabled),
+}
+
+if provider == "fake":
+    from utils.fake_model import FakeChatModel
+
+    model_name = "fake"
+    model = FakeChatModel(
+        latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "300")),
+        latency_sigma=float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5")),
+        duplicate_rate=float(os.getenv("FAKE_LLM_DUPLICATE_RATE", "0.1")),
+        error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+        seed=int(os.getenv("FAKE_LLM_SEED", "0"))
+    )
+else:
+    model = ChatOpenAI(
+        temperature=temperature,
+        model_name=model_name,
+        api_key=api_key
+    )
+
+# Below the cache, so recordings hold real model calls and their latency
+if cassette_path:
+    model = CassetteModel(model, Cassette(cassette_path), cassette_mode, cassette_timing)
+
+# Also below the cache, so only calls that reach the model are timed and traced
+if metrics_enabled:
+    model = MeteredModel(model)
+if tracing_enabled:
+    model = TracedModel(model)
+
+# Cache hits never take a gateway slot or count against the rate limits
+gateway = None
+if gateway_enabled:
+    gateway = ModelGateway(max_concurrency, requests_per_minute, tokens_per_minute, queue_deadline)
+    model = GatedModel(model, gateway)
+
+# Above the gateway, so hedges are admitted (and rate limited) like any other call
+model = HedgedModel(model, call_policies, CallPolicy(timeout=call_timeout), hedge_quantile, gateway)
+
+# A hedged call that times out counts as one failure; cached responses are still served while open
+breaker = None
+if breaker_enabled:
+    breaker = CircuitBreaker(breaker_failures, breaker_cooldown)
+    model = BreakerModel(model, breaker)
+
+    if metrics_enabled:
+        registry.register(CallbackGauge(
+            "llm_circuit_open", "1 while the model circuit breaker is open or probing", (),
+            lambda: {(): 0 if breaker.state == CLOSED else 1}
+        ))
+
+# Below the cache, so hits never wait on a call; a shared call counts once against the breaker and gateway
+if single_flight_enabled:
+    model = SingleFlightModel(model, single_flight_call_sites)
+
+if cache_enabled:
+    model = CachedModel(
+        model,
+        LLMCache(
+            MemoryCache(max_entries=cache_max_entries, ttl_seconds=cache_ttl),
+            SQLiteCache(cache_db_path, ttl_seconds=cache_ttl) if cache_db_path else None
+        ),
+        cache_policies,
+        namespace=f"{model_name}:{temperature}"
+    )
+
+    if metrics_enabled:
+        registry.register(CallbackCounter(
+            "llm_cache_requests_total", "Cached call sites looked up in the LLM cache", ("call_site", "result"),
+            lambda: {(call_site, result): stats[key]
+                     for call_site, stats in list(model.stats.items())
+                     for result, key in [("hit", "hits"), ("miss", "misses")]}
+        ))
+
 
+def base_chat_model(wrapped=None) -> BaseChatModel:
+    """
+    The chat model underneath the cache, single-flight, breaker, hedging, gateway and cassette wrappers.
+    """
+    wrapped = model if wrapped is None else wrapped
+    while not isinstance(wrapped, BaseChatModel):
+        wrapped = wrapped.model
+    return wrapped
@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from langgraph_core.game_states.compact import CompactWordGame, is_packed_word_game, stored_state, wire_state
+from langgraph_core.game_states.game_state import GameState
+
+store_backend = os.getenv("SESSION_STORE", "memory")
+session_ttl = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+max_sessions = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+sqlite_path = os.getenv("SESSION_DB_PATH", "sessions.db")
+
+
+def dump_state(state: GameState) -> str:
+    """
+    Serialize a game state to JSON, with the word game in compact form (sets are stored as lists).
+    """
+    return json.dumps(wire_state(state), default=list, separators=(",", ":"))
+
+
+def load_state(payload: str) -> GameState:
+    """
+    Deserialize a game state produced by dump_state. A compact word game stays
+    a CompactWordGame, as in the in-memory store.
+    """
+    state = json.loads(payload)
+    wg = state.get("word_game_state")
+    if is_packed_word_game(wg):
+        state["word_game_state"] = CompactWordGame.from_wire(wg)
+    elif wg and "asked_set" in wg:
+        wg["asked_set"] = set(wg["asked_set"])
+    return state
+
+
+class SessionStore(ABC):
+    """
+    Server-side storage for game states keyed by session id.
+    `on_evict` is called with the id of every session that is deleted or expires.
+    """
+    on_evict: Optional[Callable[[str], None]] = None
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[GameState]:
+        ...
+
+    @abstractmethod
+    def set(self, session_id: str, state: GameState) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    def _notify_evicted(self, session_ids):
+        if self.on_evict is not None:
+            for session_id in session_ids:
+                self.on_evict(session_id)
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    LRU session store with TTL eviction, kept in process memory.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, GameState]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[GameState]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+
+            expires_at, state = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(session_id)
+                return state
+
+            del self._entries[session_id]
+
+        self._notify_evicted([session_id])
+        return None
+
+    def set(self, session_id: str, state: GameState) -> None:
+        state = stored_state(state)
+        with self._lock:
+            self._entries[session_id] = (time.monotonic() + self.ttl_seconds, state)
+            self._entries.move_to_end(session_id)
+            evicted = self._evict()
+
+        self._notify_evicted(evicted)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            removed = self._entries.pop(session_id, None) is not None
+
+        if removed:
+            self._notify_evicted([session_id])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self) -> list[str]:
+        # Entries are in access order, so expired and least recently used ones sit at the front
+        now = time.monotonic()
+        evicted = []
+        while self._entries:
+            session_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at >= now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[session_id]
+            evicted.append(session_id)
+        return evicted
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store persisted to a SQLite database, with TTL eviction.
+    """
+
+    def __init__(self, path: str = "sessions.db", ttl_seconds: float = 3600):
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def get(self, session_id: str) -> Optional[GameState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE session_id = ? AND expires_at >= ?",
+                (session_id, time.time())
+            ).fetchone()
+        return load_state(row[0]) if row else None
+
+    def set(self, session_id: str, state: GameState) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, expires_at) VALUES (?, ?, ?)",
+                (session_id, dump_state(state), now + self.ttl_seconds)
+            )
+            expired = [row[0] for row in self._conn.execute(
+                "DELETE FROM sessions WHERE expires_at < ? RETURNING session_id", (now,)
+            )]
+
+        self._notify_evicted(expired)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+        if removed:
+            self._notify_evicted([session_id])
+
+
+def create_session_store(backend: str = store_backend) -> SessionStore:
+    """
+    Build the session store selected by the SESSION_STORE environment variable.
+    """
+    if backend == "memory":
+        return InMemorySessionStore(max_entries=max_sessions, ttl_seconds=session_ttl)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path=sqlite_path, ttl_seconds=session_ttl)
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+
+session_store = create_session_store()
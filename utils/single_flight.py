@@ -0,0 +1,113 @@
+import asyncio
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from utils.llm_cache import JOINED, prompt_text
+from utils.metrics import llm_coalesced, metrics_enabled
+
+
+class _Flight:
+    """
+    One model call shared by every caller that sent the same prompt.
+    """
+    __slots__ = ("future", "task", "waiters")
+
+    def __init__(self, future: asyncio.Future, task: asyncio.Task):
+        self.future = future
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Sends each prompt once while it is in flight: a call whose key is already
+    being sent joins that call instead of sending its own, and every caller
+    gets the same response or error. A cancelled caller leaves the call
+    running for the others; the call itself is cancelled once no caller is left.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._flights: dict[tuple, _Flight] = {}
+
+    async def submit(self, key: tuple, prompt, config: Optional[RunnableConfig] = None) -> tuple:
+        """
+        The response to the prompt, and whether it came from another caller's call.
+        """
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if flight is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            flight = self._flights[key] = _Flight(future, loop.create_task(self._send(key, future, prompt, config)))
+        elif metrics_enabled:
+            llm_coalesced.inc(key[0])
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.future), joined
+        except asyncio.CancelledError:
+            flight.waiters -= 1
+            if flight.waiters == 0:
+                self._abandon(flight)
+            raise
+
+    async def _send(self, key: tuple, future: asyncio.Future, prompt, config: Optional[RunnableConfig]):
+        try:
+            response = await self.model.ainvoke(prompt, config)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(response)
+        finally:
+            flight = self._flights.get(key)
+            if flight is not None and flight.future is future:
+                del self._flights[key]
+
+    @staticmethod
+    def _abandon(flight: _Flight):
+        if flight.future.done():
+            # Finished as the last caller left; retrieve its error so it is not logged as unhandled
+            if not flight.future.cancelled():
+                flight.future.exception()
+            return
+        flight.task.cancel()
+
+
+class SingleFlightModel:
+    """
+    Wraps a chat model so async calls of the given call sites (the `run_name`
+    in the call's config) with the same prompt text share one model call while
+    it is in flight. The call runs with the first caller's config, so its
+    tokens are only streamed to that caller. The others get a copy of the
+    response flagged with JOINED, so the cache above stores it once.
+    Other calls, sync calls, calls with extra arguments and structured-output
+    calls go straight to the wrapped model.
+    """
+
+    def __init__(self, model, call_sites: set[str]):
+        self.model = model
+        self.call_sites = call_sites
+        self.flights = SingleFlight(model)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        return self.model.with_structured_output(schema, **kwargs)
+
+    async def ainvoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        call_site = (config or {}).get("run_name")
+        if call_site not in self.call_sites or kwargs:
+            return await self.model.ainvoke(prompt, config, **kwargs)
+
+        response, joined = await self.flights.submit((call_site, prompt_text(prompt)), prompt, config)
+        if not joined:
+            return response
+        return response.model_copy(update={"response_metadata": {**response.response_metadata, JOINED: True}})
@@ -0,0 +1,236 @@
+import asyncio
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.errors import GraphBubbleUp
+
+from utils.llm_cache import prompt_text
+
+# Off by default: spans are only created when tracing is enabled
+tracing_enabled = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+# Share of traces kept, decided once per trace at its root span
+sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+trace_path = os.getenv("TRACE_PATH", "traces.jsonl")
+batch_size = int(os.getenv("TRACE_BATCH_SIZE", "100"))
+flush_seconds = float(os.getenv("TRACE_FLUSH_SECONDS", "5"))
+
+# Marks the rest of a trace whose root was not sampled
+NOT_SAMPLED = object()
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed operation, following the OpenTelemetry span data model
+    (trace/span ids as hex, unix-nano timestamps, attributes, status, events).
+    """
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_span_id: Optional[str], attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.attributes = dict(attributes)
+        self.events = []
+        self.status = {"code": "UNSET"}
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException):
+        self.events.append({
+            "name": "exception",
+            "time_unix_nano": time.time_ns(),
+            "attributes": {"exception.type": type(error).__name__, "exception.message": str(error)}
+        })
+        self.status = {"code": "ERROR", "message": str(error)}
+
+    def end(self):
+        self.end_time_unix_nano = time.time_ns()
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+            "status": self.status,
+            "events": self.events,
+        }
+
+
+class BatchExporter:
+    """
+    Buffers finished spans and appends them to a JSON Lines file in batches,
+    once `batch_size` spans are waiting or the oldest has waited `flush_seconds`.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, flush_seconds: float = 5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(span.to_dict())
+            if len(self._buffer) < self.batch_size and time.monotonic() - self._oldest < self.flush_seconds:
+                return
+            batch, self._buffer = self._buffer, []
+
+        self._write(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: list[dict]):
+        lines = "".join(json.dumps(span, separators=(",", ":"), default=str) + "\n" for span in batch)
+        try:
+            with open(self.path, "a") as f:
+                f.write(lines)
+        except OSError as e:
+            print(f"Error writing traces: {str(e)}")
+
+
+exporter = BatchExporter(trace_path, batch_size, flush_seconds)
+atexit.register(exporter.flush)
+
+
+@contextmanager
+def span(name: str, kind: str = "INTERNAL", attributes: Optional[dict] = None):
+    """
+    Time the enclosed block as a child of the current span (or as a new trace).
+    Yields the Span, or None when tracing is off or the trace is not sampled.
+    """
+    if not tracing_enabled:
+        yield None
+        return
+
+    parent = _current_span.get()
+    if parent is NOT_SAMPLED:
+        yield None
+        return
+
+    if parent is None and random.random() >= sample_rate:
+        token = _current_span.set(NOT_SAMPLED)
+        try:
+            yield None
+        finally:
+            _current_span.reset(token)
+        return
+
+    current = Span(
+        name,
+        kind,
+        trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+        parent_span_id=parent.span_id if parent else None,
+        attributes=attributes or {}
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except GraphBubbleUp:
+        # The graph pausing for player input, not an error
+        current.set_attribute("graph.interrupted", True)
+        raise
+    except asyncio.CancelledError:
+        # e.g. a question prefetch that was no longer needed
+        current.set_attribute("cancelled", True)
+        raise
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+        exporter.export(current)
+
+
+def traced_node(name: str, func: Callable) -> Callable:
+    """
+    Wrap a graph node function in a span. The wrapper keeps the node's
+    signature, so it still receives the config if it asks for it.
+    """
+    attributes = {"graph.node": name}
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def traced(*args, **kwargs):
+            with span(f"node {name}", attributes=attributes):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            with span(f"node {name}", attributes=attributes):
+                return func(*args, **kwargs)
+
+    return traced
+
+
+class TracedModel:
+    """
+    Wraps a chat model and records a client span per call, with the call site
+    (the `run_name` in the call's config) and prompt and response sizes.
+    Everything other than invoke/ainvoke is delegated to the wrapped model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def with_structured_output(self, schema, **kwargs):
+        return TracedModel(self.model.with_structured_output(schema, **kwargs))
+
+    @staticmethod
+    def _attributes(prompt, config: Optional[RunnableConfig]) -> dict:
+        return {"llm.call_site": (config or {}).get("run_name"), "llm.prompt_chars": len(prompt_text(prompt))}
+
+    @staticmethod
+    def _finish(current: Optional[Span], response):
+        if current is None:
+            return
+        content = getattr(response, "content", None)
+        current.set_attribute("llm.response_chars", len(content if isinstance(content, str) else str(response)))
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            current.set_attribute("llm.input_tokens", usage.get("input_tokens"))
+            current.set_attribute("llm.output_tokens", usage.get("output_tokens"))
+
+    def invoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        with span("llm call", kind="CLIENT", attributes=self._attributes(prompt, config)) as current:
+            response = self.model.invoke(prompt, config, **kwargs)
+            self._finish(current, response)
+            return response
+
+    async def ainvoke(self, prompt, config: Optional[RunnableConfig] = None, **kwargs):
+        with span("llm call", kind="CLIENT", attributes=self._attributes(prompt, config)) as current:
+            response = await self.model.ainvoke(prompt, config, **kwargs)
+            self._finish(current, response)
+            return response